@@ -7,7 +7,7 @@ Tracks dividend payments and yields for portfolio positions
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import requests
 
@@ -87,6 +87,24 @@ class DividendTracker:
         conn.close()
         print(f"Added dividend: {stock} ${amount:.4f} ex-date {ex_date}")
 
+    def add_dividends(self, dividends: List[Tuple[str, str, float]]):
+        """Add (stock, ex_date, amount) dividend records in one transaction"""
+        conn = sqlite3.connect(self.db_path)
+
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO dividends 
+                (stock, ex_date, amount, currency)
+                VALUES (?, ?, ?, 'AUD')
+            """,
+                dividends,
+            )
+
+        conn.close()
+        for stock, ex_date, amount in dividends:
+            print(f"Added dividend: {stock} ${amount:.4f} ex-date {ex_date}")
+
     def get_stock_dividends(
         self, stock: str, from_date: Optional[str] = None
     ) -> List[Dividend]:
@@ -286,17 +304,21 @@ ASX_DIVIDEND_DATA = {
 
 def populate_sample_dividends(tracker: DividendTracker):
     """Populate database with sample dividend data"""
-    for stock, dividends in ASX_DIVIDEND_DATA.items():
-        for div in dividends:
-            tracker.add_dividend(
-                stock=stock,
-                ex_date=str(div["ex_date"]),
-                amount=(
+    tracker.add_dividends(
+        [
+            (
+                stock,
+                str(div["ex_date"]),
+                (
                     float(div["amount"])
                     if isinstance(div["amount"], (int, float, str))
                     else 0.0
                 ),
             )
+            for stock, dividends in ASX_DIVIDEND_DATA.items()
+            for div in dividends
+        ]
+    )
 
 
 if __name__ == "__main__":
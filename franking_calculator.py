@@ -8,11 +8,40 @@ import re
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import requests
 
 
+def _franking_kernel(
+    market_value: np.ndarray,
+    franking_rate: np.ndarray,
+    estimated_yield: float,
+    company_tax_rate: float,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Annual dividend, franking credit and effective yield (%) per holding"""
+    annual_dividend = market_value * estimated_yield
+
+    # Franking credit = (dividend × franking rate × company tax rate) / (1 - company tax rate)
+    franking_credit = (annual_dividend * franking_rate * company_tax_rate) / (
+        1 - company_tax_rate
+    )
+
+    # Effective yield including franking, 0 where there is no market value
+    effective_yield = (
+        np.divide(
+            annual_dividend + franking_credit,
+            market_value,
+            out=np.zeros_like(market_value),
+            where=market_value > 0,
+        )
+        * 100
+    )
+
+    return annual_dividend, franking_credit, effective_yield
+
+
 @dataclass
 class FrankingData:
     stock: str
@@ -537,52 +566,50 @@ class FrankingTaxCalculator:
     ) -> Dict:
         """Calculate franking credit tax benefit for portfolio"""
 
-        total_dividend_income = 0.0
-        total_franking_credits = 0.0
-        stock_details = []
+        stocks = list(positions)
+        franking_infos = [self.franking_db.get_franking_info(s) for s in stocks]
 
-        for stock, position in positions.items():
-            # Get franking information
-            franking_info = self.franking_db.get_franking_info(stock)
-            franking_rate = franking_info["franking_rate"] / 100
-
-            # Estimate annual dividend income
+        # Estimate annual dividend income from market value
+        market_values = []
+        for position in positions.values():
             market_value = getattr(position, "market_value", 0)
             if market_value == 0:
                 market_value = getattr(position, "quantity", 0) * getattr(
                     position, "current_price", 0
                 )
+            market_values.append(market_value)
 
-            annual_dividend = market_value * estimated_yield
-
-            # Calculate franking credits
-            # Franking credit = (dividend × franking rate × company tax rate) / (1 - company tax rate)
-            franking_credit = (
-                annual_dividend * franking_rate * self.company_tax_rate
-            ) / (1 - self.company_tax_rate)
-
-            total_dividend_income += annual_dividend
-            total_franking_credits += franking_credit
+        market_value = np.array(market_values, dtype=float)
+        franking_rate = np.array(
+            [info["franking_rate"] for info in franking_infos], dtype=float
+        )
+        annual_dividend, franking_credit, effective_yield = _franking_kernel(
+            market_value, franking_rate / 100, estimated_yield, self.company_tax_rate
+        )
 
-            # Calculate effective yield including franking
-            effective_yield = (
-                (annual_dividend + franking_credit) / market_value * 100
-                if market_value > 0
-                else 0
-            )
+        total_dividend_income = float(annual_dividend.sum())
+        total_franking_credits = float(franking_credit.sum())
 
-            stock_details.append(
-                {
-                    "stock": stock,
-                    "market_value": market_value,
-                    "annual_dividend": annual_dividend,
-                    "franking_rate": franking_info["franking_rate"],
-                    "franking_credit": franking_credit,
-                    "effective_yield": effective_yield,
-                    "sector": franking_info["sector"],
-                    "reliability": franking_info["reliability"],
-                }
+        stock_details = [
+            {
+                "stock": stock,
+                "market_value": mv,
+                "annual_dividend": dividend,
+                "franking_rate": info["franking_rate"],
+                "franking_credit": credit,
+                "effective_yield": eff_yield,
+                "sector": info["sector"],
+                "reliability": info["reliability"],
+            }
+            for stock, info, mv, dividend, credit, eff_yield in zip(
+                stocks,
+                franking_infos,
+                market_values,
+                annual_dividend.tolist(),
+                franking_credit.tolist(),
+                effective_yield.tolist(),
             )
+        ]
 
         # Calculate tax scenarios
         marginal_tax_rate = self.get_tax_bracket(taxable_income) / 100
@@ -4,12 +4,14 @@ OHLC Data Collector for ASX Portfolio Tracker
 Completely separate module that enhances existing functionality without breaking it
 """
 
+import functools
 import logging
 import sqlite3
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 import requests
 import yfinance as yf
@@ -19,6 +21,113 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+# Yahoo Finance accepts up to 20 symbols per download request
+YF_BATCH_SIZE = 20
+
+# Prices are stored as INTEGER thousandths of a dollar (the smallest ASX tick is
+# $0.001), which SQLite packs as small varints instead of 8-byte REALs.
+# Read through the *_v views to get REAL dollar values back.
+PRICE_SCALE = 1000
+
+PRICE_COLUMNS = {
+    "daily_ohlc": ["open_price", "high_price", "low_price", "close_price"],
+    "optimal_pricing_analysis": [
+        "actual_close",
+        "optimal_buy_price",
+        "optimal_sell_price",
+        "vwap",
+        "price_range_pct",
+        "missed_opportunity_buy",
+        "missed_opportunity_sell",
+    ],
+}
+
+TABLE_DDL = {
+    "daily_ohlc": """
+        CREATE TABLE IF NOT EXISTS daily_ohlc (
+            stock TEXT NOT NULL,
+            date TEXT NOT NULL,
+            open_price INTEGER NOT NULL,
+            high_price INTEGER NOT NULL,
+            low_price INTEGER NOT NULL,
+            close_price INTEGER NOT NULL,
+            volume INTEGER DEFAULT 0,
+            source TEXT DEFAULT 'unknown',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (stock, date)
+        )
+    """,
+    "optimal_pricing_analysis": """
+        CREATE TABLE IF NOT EXISTS optimal_pricing_analysis (
+            stock TEXT NOT NULL,
+            date TEXT NOT NULL,
+            actual_close INTEGER NOT NULL,
+            optimal_buy_price INTEGER NOT NULL,
+            optimal_sell_price INTEGER NOT NULL,
+            vwap INTEGER,
+            price_range_pct INTEGER,
+            missed_opportunity_buy INTEGER,
+            missed_opportunity_sell INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (stock, date)
+        )
+    """,
+}
+
+
+def _to_scaled(value: Optional[float]) -> Optional[int]:
+    """Convert a dollar value to INTEGER storage units"""
+    if value is None:
+        return None
+    return int(round(value * PRICE_SCALE))
+
+
+def _ohlc_row(ohlc: "OHLCData") -> Tuple:
+    """Build the daily_ohlc insert parameters for an OHLC record"""
+    return (
+        ohlc.stock,
+        ohlc.date,
+        _to_scaled(ohlc.open_price),
+        _to_scaled(ohlc.high_price),
+        _to_scaled(ohlc.low_price),
+        _to_scaled(ohlc.close_price),
+        ohlc.volume,
+        ohlc.source,
+    )
+
+
+def _optimal_row(optimal: "OptimalPricing") -> Tuple:
+    """Build the optimal_pricing_analysis insert parameters for an analysis record"""
+    return (
+        optimal.stock,
+        optimal.date,
+        _to_scaled(optimal.actual_close),
+        _to_scaled(optimal.optimal_buy_price),
+        _to_scaled(optimal.optimal_sell_price),
+        _to_scaled(optimal.vwap),
+        _to_scaled(optimal.price_range_pct),
+        _to_scaled(optimal.missed_opportunity_buy),
+        _to_scaled(optimal.missed_opportunity_sell),
+    )
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply WAL journaling and cache PRAGMAs so dashboard reads don't block collector writes"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA cache_size=-20000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+@functools.lru_cache(maxsize=256)
+def _ticker(symbol: str) -> yf.Ticker:
+    """Return a cached yfinance Ticker so repeated lookups reuse its session"""
+    return yf.Ticker(symbol)
+
+
 @dataclass
 class OHLCData:
     """Open, High, Low, Close data structure"""
@@ -55,51 +164,72 @@ class OHLCCollector:
 
     def __init__(self, db_path: str = "portfolio.db"):
         self.db_path = db_path
+        # Reused across EODHD calls so keep-alive connections are pooled
+        self.session = requests.Session()
         self.setup_ohlc_tables()
 
+    def _connect(self) -> sqlite3.Connection:
+        """Open a configured connection whose write transactions start with BEGIN IMMEDIATE"""
+        return configure_connection(
+            sqlite3.connect(self.db_path, isolation_level="IMMEDIATE")
+        )
+
     def setup_ohlc_tables(self) -> bool:
         """Create OHLC tables if they don't exist (safe - doesn't modify existing tables)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
-            # OHLC data storage
+            # OHLC data storage and optimal pricing analysis
+            cursor.execute(TABLE_DDL["daily_ohlc"])
+            cursor.execute(TABLE_DDL["optimal_pricing_analysis"])
+
+            # Convert databases created before INTEGER price storage
+            self.migrate_price_storage(cursor)
+
+            # Date indexes for retention cleanup and date-window queries
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_daily_ohlc_date ON daily_ohlc(date)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_optimal_pricing_analysis_date "
+                "ON optimal_pricing_analysis(date)"
+            )
+
+            # Covering (stock, date, ...) indexes so the dashboard's per-stock
+            # summaries are answered from the index without table lookups
             cursor.execute(
                 """
-                CREATE TABLE IF NOT EXISTS daily_ohlc (
-                    stock TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    open_price REAL NOT NULL,
-                    high_price REAL NOT NULL,
-                    low_price REAL NOT NULL,
-                    close_price REAL NOT NULL,
-                    volume INTEGER DEFAULT 0,
-                    source TEXT DEFAULT 'unknown',
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (stock, date)
-                )
+                CREATE INDEX IF NOT EXISTS idx_ohlc_stock_date
+                ON daily_ohlc(stock, date, high_price, low_price, close_price, volume)
             """
             )
-
-            # Optimal pricing analysis
             cursor.execute(
                 """
-                CREATE TABLE IF NOT EXISTS optimal_pricing_analysis (
-                    stock TEXT NOT NULL,
-                    date TEXT NOT NULL,
-                    actual_close REAL NOT NULL,
-                    optimal_buy_price REAL NOT NULL,
-                    optimal_sell_price REAL NOT NULL,
-                    vwap REAL,
-                    price_range_pct REAL,
-                    missed_opportunity_buy REAL,
-                    missed_opportunity_sell REAL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    PRIMARY KEY (stock, date)
+                CREATE INDEX IF NOT EXISTS idx_optimal_pricing_stock_date
+                ON optimal_pricing_analysis(
+                    stock, date, missed_opportunity_buy, missed_opportunity_sell,
+                    price_range_pct
                 )
             """
             )
 
+            # REAL-valued views for readers
+            for table, columns in PRICE_COLUMNS.items():
+                cursor.execute(f"PRAGMA table_info({table})")
+                scaled = set(columns)
+                select_list = ", ".join(
+                    (
+                        f"{row[1]} / {PRICE_SCALE}.0 AS {row[1]}"
+                        if row[1] in scaled
+                        else row[1]
+                    )
+                    for row in cursor.fetchall()
+                )
+                cursor.execute(
+                    f"CREATE VIEW IF NOT EXISTS {table}_v AS SELECT {select_list} FROM {table}"
+                )
+
             # Feature configuration
             cursor.execute(
                 """
@@ -112,17 +242,13 @@ class OHLCCollector:
             )
 
             # Set default configuration
-            cursor.execute(
-                "INSERT OR IGNORE INTO ohlc_config (key, value) VALUES (?, ?)",
-                ("enabled", "true"),
-            )
-            cursor.execute(
-                "INSERT OR IGNORE INTO ohlc_config (key, value) VALUES (?, ?)",
-                ("retention_days", "90"),
-            )
-            cursor.execute(
+            cursor.executemany(
                 "INSERT OR IGNORE INTO ohlc_config (key, value) VALUES (?, ?)",
-                ("auto_collect", "false"),
+                [
+                    ("enabled", "true"),
+                    ("retention_days", "90"),
+                    ("auto_collect", "false"),
+                ],
             )
 
             conn.commit()
@@ -135,10 +261,44 @@ class OHLCCollector:
             logger.error(f"❌ Failed to setup OHLC tables: {e}")
             return False
 
+    def migrate_price_storage(self, cursor: sqlite3.Cursor) -> List[str]:
+        """One-shot migration of legacy REAL price columns to scaled INTEGER storage"""
+        migrated = []
+
+        for table, columns in PRICE_COLUMNS.items():
+            cursor.execute(f"PRAGMA table_info({table})")
+            column_types = {row[1]: row[2].upper() for row in cursor.fetchall()}
+            if column_types.get(columns[0]) != "REAL":
+                continue
+
+            legacy_table = f"{table}_real"
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy_table}")
+            cursor.execute(TABLE_DDL[table])
+
+            column_names = list(column_types)
+            select_list = ", ".join(
+                (
+                    f"CAST(ROUND({name} * {PRICE_SCALE}) AS INTEGER)"
+                    if name in columns
+                    else name
+                )
+                for name in column_names
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(column_names)}) "
+                f"SELECT {select_list} FROM {legacy_table}"
+            )
+            cursor.execute(f"DROP TABLE {legacy_table}")
+
+            migrated.append(table)
+            logger.info(f"✅ Migrated {table} prices to INTEGER storage")
+
+        return migrated
+
     def is_enabled(self) -> bool:
         """Check if OHLC collection is enabled"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("SELECT value FROM ohlc_config WHERE key = ?", ("enabled",))
             result = cursor.fetchone()
@@ -158,7 +318,7 @@ class OHLCCollector:
             url = f"https://eodhd.com/api/eod/{stock}.AX"
             params = {"api_token": api_key, "fmt": "json", "from": date, "to": date}
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
 
             if response.status_code == 200:
                 data = response.json()
@@ -198,7 +358,7 @@ class OHLCCollector:
                 "to": to_date,
             }
 
-            response = requests.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
 
             if response.status_code == 200:
                 data = response.json()
@@ -239,7 +399,7 @@ class OHLCCollector:
 
         try:
             ticker = f"{stock}.AX"
-            yf_stock = yf.Ticker(ticker)
+            yf_stock = _ticker(ticker)
 
             # Get data for the specific date
             start_date = date
@@ -269,16 +429,16 @@ class OHLCCollector:
             logger.error(f"❌ Yahoo Finance OHLC fetch failed for {stock}: {e}")
             return None
 
-    def fetch_historical_ohlc_yfinance(
+    def fetch_history_df_yfinance(
         self, stock: str, from_date: str, to_date: str = None, period: str = None
-    ) -> List[OHLCData]:
-        """Fetch historical OHLC data from Yahoo Finance for date range"""
+    ) -> pd.DataFrame:
+        """Fetch the raw Yahoo Finance history DataFrame for date range or period"""
         if not to_date and not period:
             to_date = datetime.now().strftime("%Y-%m-%d")
 
         try:
             ticker = f"{stock}.AX"
-            yf_stock = yf.Ticker(ticker)
+            yf_stock = _ticker(ticker)
 
             if period:
                 # Use period-based fetching (more reliable)
@@ -289,23 +449,45 @@ class OHLCCollector:
 
             if hist.empty:
                 logger.warning(f"⚠️  No historical Yahoo Finance data for {stock}")
+
+            return hist
+
+        except Exception as e:
+            logger.error(f"❌ Historical Yahoo Finance fetch failed for {stock}: {e}")
+            return pd.DataFrame()
+
+    def fetch_historical_ohlc_yfinance(
+        self, stock: str, from_date: str, to_date: str = None, period: str = None
+    ) -> List[OHLCData]:
+        """Fetch historical OHLC data from Yahoo Finance for date range"""
+        try:
+            hist = self.fetch_history_df_yfinance(stock, from_date, to_date, period)
+
+            if hist.empty:
                 return []
 
-            ohlc_list = []
-            for date_idx, day_data in hist.iterrows():
-                date_str = date_idx.strftime("%Y-%m-%d")
-                ohlc_list.append(
-                    OHLCData(
-                        stock=stock,
-                        date=date_str,
-                        open_price=float(day_data["Open"]),
-                        high_price=float(day_data["High"]),
-                        low_price=float(day_data["Low"]),
-                        close_price=float(day_data["Close"]),
-                        volume=int(day_data["Volume"]),
-                        source="yfinance",
-                    )
+            # Iterate plain column lists rather than boxing each row in a Series
+            dates = hist.index.strftime("%Y-%m-%d").tolist()
+            ohlc_list = [
+                OHLCData(
+                    stock=stock,
+                    date=date_str,
+                    open_price=float(open_price),
+                    high_price=float(high_price),
+                    low_price=float(low_price),
+                    close_price=float(close_price),
+                    volume=int(volume),
+                    source="yfinance",
+                )
+                for date_str, open_price, high_price, low_price, close_price, volume in zip(
+                    dates,
+                    hist["Open"].tolist(),
+                    hist["High"].tolist(),
+                    hist["Low"].tolist(),
+                    hist["Close"].tolist(),
+                    hist["Volume"].tolist(),
                 )
+            ]
 
             logger.info(
                 f"✅ Fetched {len(ohlc_list)} historical OHLC records for {stock} from Yahoo Finance"
@@ -319,7 +501,7 @@ class OHLCCollector:
     def store_ohlc_data(self, ohlc: OHLCData) -> bool:
         """Store OHLC data in database"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -328,16 +510,7 @@ class OHLCCollector:
                 (stock, date, open_price, high_price, low_price, close_price, volume, source)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-                (
-                    ohlc.stock,
-                    ohlc.date,
-                    ohlc.open_price,
-                    ohlc.high_price,
-                    ohlc.low_price,
-                    ohlc.close_price,
-                    ohlc.volume,
-                    ohlc.source,
-                ),
+                _ohlc_row(ohlc),
             )
 
             conn.commit()
@@ -350,6 +523,142 @@ class OHLCCollector:
             logger.error(f"❌ Failed to store OHLC data: {e}")
             return False
 
+    def ingest_history_df(
+        self, stock: str, hist: pd.DataFrame, source: str = "yfinance"
+    ) -> int:
+        """Bulk store a Yahoo Finance history DataFrame and its optimal pricing analysis"""
+        hist = hist.dropna(subset=["Open", "High", "Low", "Close"])
+        hist = hist[hist["Close"] > 0]
+        if hist.empty:
+            return 0
+
+        high, low, close = hist["High"], hist["Low"], hist["Close"]
+
+        # Same arithmetic as calculate_optimal_pricing, one column at a time
+        staging = pd.DataFrame(
+            {
+                "stock": stock,
+                "date": hist.index.strftime("%Y-%m-%d"),
+                "open_price": hist["Open"].to_numpy(),
+                "high_price": high.to_numpy(),
+                "low_price": low.to_numpy(),
+                "close_price": close.to_numpy(),
+                "volume": hist["Volume"].fillna(0).astype("int64").to_numpy(),
+                "source": source,
+                "vwap": ((high + low + close) / 3).to_numpy(),
+                "price_range_pct": ((high - low) / close * 100).to_numpy(),
+                "missed_opportunity_buy": (close - low).to_numpy(),
+                "missed_opportunity_sell": (high - close).to_numpy(),
+            }
+        )
+        scaled = [
+            "open_price",
+            "high_price",
+            "low_price",
+            "close_price",
+            "vwap",
+            "price_range_pct",
+            "missed_opportunity_buy",
+            "missed_opportunity_sell",
+        ]
+        staging[scaled] = (staging[scaled] * PRICE_SCALE).round().astype("int64")
+
+        # Plain Python rows (sqlite3 can't bind NumPy integers), column by column
+        def rows(*columns):
+            return list(zip(*(staging[column].tolist() for column in columns)))
+
+        conn = None
+        try:
+            conn = self._connect()
+
+            # Upsert both tables in one transaction so existing rows are
+            # replaced, not duplicated
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO daily_ohlc
+                    (stock, date, open_price, high_price, low_price, close_price, volume, source)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    rows(
+                        "stock",
+                        "date",
+                        "open_price",
+                        "high_price",
+                        "low_price",
+                        "close_price",
+                        "volume",
+                        "source",
+                    ),
+                )
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO optimal_pricing_analysis
+                    (stock, date, actual_close, optimal_buy_price, optimal_sell_price,
+                     vwap, price_range_pct, missed_opportunity_buy, missed_opportunity_sell)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                    rows(
+                        "stock",
+                        "date",
+                        "close_price",
+                        "low_price",
+                        "high_price",
+                        "vwap",
+                        "price_range_pct",
+                        "missed_opportunity_buy",
+                        "missed_opportunity_sell",
+                    ),
+                )
+
+            return len(staging)
+
+        except Exception as e:
+            logger.error(f"❌ Failed to ingest history for {stock}: {e}")
+            return 0
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def store_ohlc_batch(self, ohlc_list: List[OHLCData]) -> int:
+        """Store OHLC data and optimal pricing analysis for many records in one transaction"""
+        if not ohlc_list:
+            return 0
+
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO daily_ohlc
+                (stock, date, open_price, high_price, low_price, close_price, volume, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                [_ohlc_row(ohlc) for ohlc in ohlc_list],
+            )
+
+            optimal_list = [self.calculate_optimal_pricing(ohlc) for ohlc in ohlc_list]
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO optimal_pricing_analysis
+                (stock, date, actual_close, optimal_buy_price, optimal_sell_price,
+                 vwap, price_range_pct, missed_opportunity_buy, missed_opportunity_sell)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                [_optimal_row(optimal) for optimal in optimal_list],
+            )
+
+            conn.commit()
+            conn.close()
+
+            logger.info(f"✅ Stored {len(ohlc_list)} OHLC records")
+            return len(ohlc_list)
+
+        except Exception as e:
+            logger.error(f"❌ Failed to store OHLC batch: {e}")
+            return 0
+
     def calculate_optimal_pricing(self, ohlc: OHLCData) -> OptimalPricing:
         """Calculate optimal pricing analysis from OHLC data"""
 
@@ -379,7 +688,7 @@ class OHLCCollector:
     def store_optimal_pricing(self, optimal: OptimalPricing) -> bool:
         """Store optimal pricing analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute(
@@ -389,17 +698,7 @@ class OHLCCollector:
                  vwap, price_range_pct, missed_opportunity_buy, missed_opportunity_sell)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-                (
-                    optimal.stock,
-                    optimal.date,
-                    optimal.actual_close,
-                    optimal.optimal_buy_price,
-                    optimal.optimal_sell_price,
-                    optimal.vwap,
-                    optimal.price_range_pct,
-                    optimal.missed_opportunity_buy,
-                    optimal.missed_opportunity_sell,
-                ),
+                _optimal_row(optimal),
             )
 
             conn.commit()
@@ -444,12 +743,8 @@ class OHLCCollector:
                 ohlc_data = self.fetch_ohlc_yfinance(stock, date)
 
         if ohlc_data:
-            # Store OHLC data
-            if self.store_ohlc_data(ohlc_data):
-                # Calculate and store optimal pricing analysis
-                optimal = self.calculate_optimal_pricing(ohlc_data)
-                self.store_optimal_pricing(optimal)
-
+            # Store OHLC data and optimal pricing analysis in one transaction
+            if self.store_ohlc_batch([ohlc_data]):
                 logger.info(
                     f"📊 {stock}: Open=${ohlc_data.open_price:.3f}, "
                     f"High=${ohlc_data.high_price:.3f}, "
@@ -473,6 +768,10 @@ class OHLCCollector:
         results = {}
         eodhd_calls_used = 0
 
+        # Resolve the date once for the whole batch
+        if not date:
+            date = datetime.now().strftime("%Y-%m-%d")
+
         logger.info(
             f"🔄 Starting OHLC collection for {len(stocks)} stocks (Priority: {'Yahoo Finance' if prefer_yfinance else 'EODHD'})"
         )
@@ -502,10 +801,94 @@ class OHLCCollector:
 
         return results
 
+    def collect_portfolio_ohlc_batched(
+        self, stocks: List[str], api_key: str = "demo", date: str = None
+    ) -> Dict[str, bool]:
+        """Collect OHLC data for multiple stocks with one Yahoo Finance request per batch"""
+        if not self.is_enabled():
+            logger.info("OHLC collection is disabled")
+            return {stock: False for stock in stocks}
+
+        if not date:
+            date = datetime.now().strftime("%Y-%m-%d")
+        end_date = (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime(
+            "%Y-%m-%d"
+        )
+
+        logger.info(
+            f"🔄 Starting batched OHLC collection for {len(stocks)} stocks on {date}"
+        )
+
+        results = {}
+        for i in range(0, len(stocks), YF_BATCH_SIZE):
+            batch = stocks[i : i + YF_BATCH_SIZE]
+            ohlc_list = []
+
+            try:
+                hist = yf.download(
+                    " ".join(f"{stock}.AX" for stock in batch),
+                    start=date,
+                    end=end_date,
+                    group_by="ticker",
+                    threads=False,
+                    progress=False,
+                )
+
+                for stock in batch:
+                    ticker = f"{stock}.AX"
+                    if isinstance(hist.columns, pd.MultiIndex):
+                        if ticker not in hist.columns.get_level_values(0):
+                            continue
+                        stock_hist = hist[ticker]
+                    else:
+                        stock_hist = hist
+
+                    stock_hist = stock_hist.dropna(
+                        subset=["Open", "High", "Low", "Close"]
+                    )
+                    if stock_hist.empty:
+                        continue
+
+                    day_data = stock_hist.iloc[0]
+                    ohlc_list.append(
+                        OHLCData(
+                            stock=stock,
+                            date=date,
+                            open_price=float(day_data["Open"]),
+                            high_price=float(day_data["High"]),
+                            low_price=float(day_data["Low"]),
+                            close_price=float(day_data["Close"]),
+                            volume=int(day_data["Volume"]),
+                            source="yfinance",
+                        )
+                    )
+
+            except Exception as e:
+                logger.error(f"❌ Batched Yahoo Finance download failed: {e}")
+
+            stored = self.store_ohlc_batch(ohlc_list) == len(ohlc_list)
+            collected = {ohlc.stock for ohlc in ohlc_list} if stored else set()
+
+            # Anything the batch missed goes through the per-stock path
+            for stock in batch:
+                if stock in collected:
+                    results[stock] = True
+                else:
+                    results[stock] = self.collect_stock_ohlc(
+                        stock, api_key, date, prefer_yfinance=True
+                    )
+
+        successful = sum(1 for success in results.values() if success)
+        logger.info(
+            f"📈 OHLC collection complete: {successful}/{len(stocks)} successful"
+        )
+
+        return results
+
     def get_portfolio_stocks_from_db(self) -> List[str]:
         """Get list of stocks from existing portfolio (safe read-only operation)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute("SELECT DISTINCT stock FROM transactions ORDER BY stock")
@@ -521,13 +904,13 @@ class OHLCCollector:
     def get_ohlc_data(self, stock: str, days: int = 30) -> List[OHLCData]:
         """Retrieve stored OHLC data for analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute(
                 """
                 SELECT stock, date, open_price, high_price, low_price, close_price, volume, source
-                FROM daily_ohlc
+                FROM daily_ohlc_v
                 WHERE stock = ? 
                 ORDER BY date DESC
                 LIMIT ?
@@ -562,14 +945,14 @@ class OHLCCollector:
     ) -> List[OptimalPricing]:
         """Retrieve optimal pricing analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute(
                 """
                 SELECT stock, date, actual_close, optimal_buy_price, optimal_sell_price,
                        vwap, price_range_pct, missed_opportunity_buy, missed_opportunity_sell
-                FROM optimal_pricing_analysis
+                FROM optimal_pricing_analysis_v
                 WHERE stock = ?
                 ORDER BY date DESC
                 LIMIT ?
@@ -606,6 +989,8 @@ class OHLCCollector:
         days: int = 30,
         api_key: str = "demo",
         prefer_yfinance: bool = True,
+        from_date: str = None,
+        to_date: str = None,
     ) -> int:
         """Collect historical OHLC data for a stock"""
 
@@ -613,8 +998,10 @@ class OHLCCollector:
             logger.info("OHLC collection is disabled")
             return 0
 
-        from_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
-        to_date = datetime.now().strftime("%Y-%m-%d")
+        if not from_date:
+            from_date = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d")
+        if not to_date:
+            to_date = datetime.now().strftime("%Y-%m-%d")
 
         logger.info(f"🔄 Collecting {days} days of historical OHLC data for {stock}")
 
@@ -631,12 +1018,22 @@ class OHLCCollector:
             else:
                 period = "1y"
 
-            ohlc_list = self.fetch_historical_ohlc_yfinance(
+            # Yahoo Finance histories go straight from DataFrame to SQLite
+            hist = self.fetch_history_df_yfinance(
                 stock, from_date, to_date, period=period
             )
 
+            if not hist.empty:
+                stored_count = self.ingest_history_df(stock, hist)
+                logger.info(
+                    f"✅ Stored {stored_count}/{len(hist)} historical records for {stock}"
+                )
+                return stored_count
+
+            ohlc_list = []
+
             # Fallback to EODHD if Yahoo Finance fails
-            if not ohlc_list and api_key != "demo":
+            if api_key != "demo":
                 logger.info(f"⚠️  Yahoo Finance failed for {stock}, trying EODHD...")
                 ohlc_list = self.fetch_historical_ohlc_eodhd(
                     stock, api_key, from_date, to_date
@@ -653,13 +1050,8 @@ class OHLCCollector:
                     stock, from_date, to_date
                 )
 
-        # Store all data and calculate optimal pricing
-        stored_count = 0
-        for ohlc in ohlc_list:
-            if self.store_ohlc_data(ohlc):
-                optimal = self.calculate_optimal_pricing(ohlc)
-                self.store_optimal_pricing(optimal)
-                stored_count += 1
+        # Store all data and optimal pricing in a single transaction
+        stored_count = self.store_ohlc_batch(ohlc_list)
 
         logger.info(
             f"✅ Stored {stored_count}/{len(ohlc_list)} historical records for {stock}"
@@ -683,10 +1075,15 @@ class OHLCCollector:
         results = {}
         total_records = 0
 
+        # Resolve the date range once for the whole batch
+        now = datetime.now()
+        from_date = (now - timedelta(days=days)).strftime("%Y-%m-%d")
+        to_date = now.strftime("%Y-%m-%d")
+
         for stock in stocks:
             try:
                 count = self.collect_historical_data(
-                    stock, days, api_key, prefer_yfinance
+                    stock, days, api_key, prefer_yfinance, from_date, to_date
                 )
                 results[stock] = count
                 total_records += count
@@ -704,33 +1101,29 @@ class OHLCCollector:
     def get_missing_dates(self, stock: str, days: int = 30) -> List[str]:
         """Get list of dates where OHLC data is missing for a stock"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
-            # Get existing dates
-            cursor.execute(
-                "SELECT DISTINCT date FROM daily_ohlc WHERE stock = ? ORDER BY date",
-                (stock,),
-            )
-            existing_dates = set(row[0] for row in cursor.fetchall())
-            conn.close()
-
-            # Generate expected date range (excluding weekends)
             end_date = datetime.now()
             start_date = end_date - timedelta(days=days)
 
-            expected_dates = []
-            current_date = start_date
+            # Get existing dates inside the window
+            cursor.execute(
+                "SELECT date FROM daily_ohlc WHERE stock = ? AND date >= ?",
+                (stock, start_date.strftime("%Y-%m-%d")),
+            )
+            existing_dates = np.array(
+                [row[0] for row in cursor.fetchall()], dtype="datetime64[D]"
+            )
+            conn.close()
 
-            while current_date <= end_date:
-                # Skip weekends (ASX closed Saturday=5, Sunday=6)
-                if current_date.weekday() < 5:
-                    date_str = current_date.strftime("%Y-%m-%d")
-                    if date_str not in existing_dates:
-                        expected_dates.append(date_str)
-                current_date += timedelta(days=1)
+            # Expected trading days (ASX closed weekends), minus those on file
+            expected_dates = pd.bdate_range(
+                start_date.date(), end_date.date()
+            ).values.astype("datetime64[D]")
+            missing_dates = np.setdiff1d(expected_dates, existing_dates)
 
-            return expected_dates
+            return missing_dates.astype(str).tolist()
 
         except Exception as e:
             logger.error(f"❌ Error checking missing dates for {stock}: {e}")
@@ -741,6 +1134,10 @@ class OHLCCollector:
     ) -> Dict[str, int]:
         """Fill in missing OHLC data for all portfolio stocks"""
 
+        if not self.is_enabled():
+            logger.info("OHLC collection is disabled")
+            return {}
+
         stocks = self.get_portfolio_stocks_from_db()
         results = {}
         total_filled = 0
@@ -754,15 +1151,42 @@ class OHLCCollector:
                 logger.info(f"📥 Filling {len(missing_dates)} missing dates for {stock}")
                 filled_count = 0
 
-                for date in missing_dates:
-                    try:
-                        success = self.collect_stock_ohlc(
-                            stock, api_key, date, prefer_yfinance
+                # One range fetch covering every gap instead of one request per date
+                from_date = min(missing_dates)
+                to_date = max(missing_dates)
+                # Yahoo Finance treats the end date as exclusive
+                yf_to_date = (
+                    datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
+                ).strftime("%Y-%m-%d")
+
+                try:
+                    if prefer_yfinance:
+                        ohlc_list = self.fetch_historical_ohlc_yfinance(
+                            stock, from_date, yf_to_date
                         )
-                        if success:
-                            filled_count += 1
-                    except Exception as e:
-                        logger.error(f"❌ Failed to fill {stock} on {date}: {e}")
+
+                        if not ohlc_list and api_key != "demo":
+                            logger.info(
+                                f"⚠️  Yahoo Finance failed for {stock}, trying EODHD..."
+                            )
+                            ohlc_list = self.fetch_historical_ohlc_eodhd(
+                                stock, api_key, from_date, to_date
+                            )
+                    else:
+                        ohlc_list = self.fetch_historical_ohlc_eodhd(
+                            stock, api_key, from_date, to_date
+                        )
+
+                        if not ohlc_list:
+                            ohlc_list = self.fetch_historical_ohlc_yfinance(
+                                stock, from_date, yf_to_date
+                            )
+
+                    missing_set = set(missing_dates)
+                    ohlc_list = [o for o in ohlc_list if o.date in missing_set]
+                    filled_count = self.store_ohlc_batch(ohlc_list)
+                except Exception as e:
+                    logger.error(f"❌ Failed to fill {stock}: {e}")
 
                 results[stock] = filled_count
                 total_filled += filled_count
@@ -777,25 +1201,32 @@ class OHLCCollector:
         logger.info(f"🎉 Gap filling complete: {total_filled} missing records filled")
         return results
 
-    def cleanup_old_data(self, retention_days: int = 90):
+    def cleanup_old_data(self, retention_days: int = 90, vacuum: bool = False):
         """Clean up old OHLC data to prevent database bloat"""
         try:
             cutoff_date = (datetime.now() - timedelta(days=retention_days)).strftime(
                 "%Y-%m-%d"
             )
 
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            conn = self._connect()
 
-            cursor.execute("DELETE FROM daily_ohlc WHERE date < ?", (cutoff_date,))
-            ohlc_deleted = cursor.rowcount
+            # Both deletes commit together, using the date indexes
+            with conn:
+                cursor = conn.execute(
+                    "DELETE FROM daily_ohlc WHERE date < ?", (cutoff_date,)
+                )
+                ohlc_deleted = cursor.rowcount
 
-            cursor.execute(
-                "DELETE FROM optimal_pricing_analysis WHERE date < ?", (cutoff_date,)
-            )
-            analysis_deleted = cursor.rowcount
+                cursor = conn.execute(
+                    "DELETE FROM optimal_pricing_analysis WHERE date < ?",
+                    (cutoff_date,),
+                )
+                analysis_deleted = cursor.rowcount
+
+            # Reclaim freed pages (must run outside a transaction)
+            if vacuum:
+                conn.execute("VACUUM")
 
-            conn.commit()
             conn.close()
 
             logger.info(
@@ -854,6 +1285,11 @@ def main():
         metavar="DAYS",
         help="Clean up OHLC data older than N days",
     )
+    parser.add_argument(
+        "--vacuum",
+        action="store_true",
+        help="Reclaim database space after --cleanup",
+    )
 
     args = parser.parse_args()
 
@@ -920,8 +1356,12 @@ def main():
 
             if args.save_api_calls:
                 # Yahoo Finance only mode
-                results = collector.collect_portfolio_ohlc(
-                    stocks, "demo", args.date, prefer_yfinance=True
+                results = collector.collect_portfolio_ohlc_batched(
+                    stocks, "demo", args.date
+                )
+            elif prefer_yfinance:
+                results = collector.collect_portfolio_ohlc_batched(
+                    stocks, args.api_key, args.date
                 )
             else:
                 results = collector.collect_portfolio_ohlc(
@@ -983,7 +1423,7 @@ def main():
         days = args.cleanup
         print(f"🧹 Cleaning up OHLC data older than {days} days...")
 
-        collector.cleanup_old_data(days)
+        collector.cleanup_old_data(days, vacuum=args.vacuum)
         print("✅ Cleanup complete")
 
     else:
@@ -4,9 +4,12 @@ OHLC Analysis Dashboard for ASX Portfolio Tracker
 Order simulation and optimal pricing analysis interface
 """
 
+import queue
 import sqlite3
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
@@ -16,7 +19,210 @@ import streamlit as st
 from plotly.subplots import make_subplots
 
 # Import our OHLC collector
-from ohlc_collector import OHLCCollector, OHLCData, OptimalPricing
+from ohlc_collector import (
+    OHLCCollector,
+    OHLCData,
+    OptimalPricing,
+    configure_connection,
+)
+
+READ_POOL_SIZE = 5
+
+# Current positions derived from the transactions table
+POSITIONS_QUERY = """
+SELECT 
+    stock,
+    SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) as quantity,
+    SUM(CASE WHEN action = 'buy' THEN total + fees ELSE -(total - fees) END) / 
+        SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) as avg_cost
+FROM transactions 
+GROUP BY stock 
+HAVING SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) > 0
+"""
+
+# SQLite aggregates can come back as mixed int/float objects; pin them to float64
+POSITION_DTYPES = {"quantity": "float64", "avg_cost": "float64"}
+# Display-only aggregates never need more than float32 precision
+OHLC_SUMMARY_DTYPES = {
+    "avg_daily_range": "float32",
+    "avg_range_pct": "float32",
+    "avg_volume": "float32",
+}
+OPTIMAL_SUMMARY_DTYPES = {
+    "avg_missed_buy": "float32",
+    "avg_missed_sell": "float32",
+    "avg_volatility": "float32",
+    "total_missed_value": "float32",
+}
+
+
+class _ConnPool:
+    """Fixed-size pool of read-only SQLite connections"""
+
+    def __init__(self, db_path: str, size: int = READ_POOL_SIZE):
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self._readers = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(
+                uri, uri=True, check_same_thread=False, isolation_level=None
+            )
+            self._readers.put(configure_connection(conn))
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection, returning it to the pool afterwards"""
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+
+def _format_price(values) -> np.ndarray:
+    """Format prices as $x.xxx strings in one vectorized pass"""
+    return np.char.mod("$%.3f", np.asarray(values, dtype=np.float64))
+
+
+def _query_frame(
+    conn: sqlite3.Connection, query: str, params: Tuple = ()
+) -> pd.DataFrame:
+    """Run a small query straight into a DataFrame, skipping read_sql_query overhead"""
+    cursor = conn.execute(query, params)
+    columns = [description[0] for description in cursor.description]
+    return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+
+@st.cache_resource
+def _get_read_pool(db_path: str) -> _ConnPool:
+    """Read-only connection pool shared across Streamlit reruns"""
+    return _ConnPool(db_path)
+
+
+# Summaries are cached across reruns; data_version is part of the cache key so
+# a collector write or a new transaction forces a recompute before the TTL
+# expires.
+@st.cache_data(ttl=300, show_spinner=False)
+def _ohlc_summary(db_path: str, days: int, data_version: Tuple) -> pd.DataFrame:
+    """OHLC summary for all portfolio stocks"""
+    query = """
+    SELECT 
+        stock,
+        COUNT(*) as days_with_data,
+        AVG(high_price - low_price) as avg_daily_range,
+        AVG((high_price - low_price) / close_price * 100) as avg_range_pct,
+        MAX(date) as latest_date,
+        AVG(volume) as avg_volume
+    FROM daily_ohlc_v 
+    WHERE date >= date('now', ?)
+    GROUP BY stock
+    ORDER BY avg_range_pct DESC
+    """
+
+    with _get_read_pool(db_path).reader() as conn:
+        df = _query_frame(conn, query, (f"-{int(days)} days",))
+    return df.astype(OHLC_SUMMARY_DTYPES)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _optimal_pricing_summary(
+    db_path: str, days: int, data_version: Tuple
+) -> pd.DataFrame:
+    """Optimal pricing opportunities summary"""
+    query = """
+    SELECT 
+        stock,
+        COUNT(*) as analysis_days,
+        AVG(missed_opportunity_buy) as avg_missed_buy,
+        AVG(missed_opportunity_sell) as avg_missed_sell,
+        AVG(price_range_pct) as avg_volatility,
+        SUM(missed_opportunity_buy + missed_opportunity_sell) as total_missed_value,
+        MAX(date) as latest_analysis
+    FROM optimal_pricing_analysis_v 
+    WHERE date >= date('now', ?)
+    GROUP BY stock
+    ORDER BY total_missed_value ASC
+    """
+
+    with _get_read_pool(db_path).reader() as conn:
+        df = _query_frame(conn, query, (f"-{int(days)} days",))
+    return df.astype(OPTIMAL_SUMMARY_DTYPES)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _perfect_timing_portfolio(
+    db_path: str, data_version: Tuple
+) -> Tuple[pd.DataFrame, Dict]:
+    """Per-stock perfect timing frame and portfolio summary"""
+    # Positions joined to each stock's latest OHLC row in one query
+    query = f"""
+    WITH positions AS ({POSITIONS_QUERY}),
+    latest AS (
+        SELECT stock, MAX(date) AS latest_date
+        FROM daily_ohlc
+        GROUP BY stock
+    )
+    SELECT
+        positions.stock,
+        positions.quantity,
+        positions.avg_cost,
+        ohlc.close_price AS current_price,
+        ohlc.high_price AS optimal_price
+    FROM positions
+    JOIN latest ON latest.stock = positions.stock
+    JOIN daily_ohlc_v ohlc
+        ON ohlc.stock = latest.stock AND ohlc.date = latest.latest_date
+    """
+
+    with _get_read_pool(db_path).reader() as conn:
+        rows = conn.execute(query).fetchall()
+
+    if not rows:
+        return pd.DataFrame(), {}
+
+    arr = np.rec.fromrecords(
+        rows,
+        dtype=[
+            ("stock", object),
+            ("quantity", np.float64),
+            ("avg_cost", np.float64),
+            ("current_price", np.float64),
+            ("optimal_price", np.float64),
+        ],
+    )
+
+    current_value = arr.quantity * arr.current_price
+    missed_opportunity = arr.quantity * (arr.optimal_price - arr.current_price)
+    optimal_value = current_value + missed_opportunity
+
+    results = pd.DataFrame(
+        {
+            "stock": arr.stock,
+            "quantity": arr.quantity,
+            "avg_cost": arr.avg_cost,
+            "current_price": arr.current_price,
+            "optimal_price": arr.optimal_price,
+            "current_value": current_value,
+            "optimal_value": optimal_value,
+            "missed_opportunity": missed_opportunity,
+            "cost_basis": arr.quantity * arr.avg_cost,
+        }
+    )
+
+    total_current_value = float(current_value.sum())
+    total_missed_opportunities = float(missed_opportunity.sum())
+
+    summary = {
+        "total_current_value": total_current_value,
+        "total_optimal_value": total_current_value + total_missed_opportunities,
+        "total_missed_opportunities": total_missed_opportunities,
+        "missed_opportunity_pct": (
+            total_missed_opportunities / total_current_value * 100
+            if total_current_value > 0
+            else 0.0
+        ),
+    }
+
+    return results, summary
 
 
 class OHLCDashboard:
@@ -24,7 +230,9 @@ class OHLCDashboard:
 
     def __init__(self, db_path: str = "portfolio.db"):
         self.db_path = db_path
+        # Collector owns all writes and creates the tables the readers need
         self.collector = OHLCCollector(db_path)
+        self._pool = _get_read_pool(db_path)
 
     def get_portfolio_stocks(self) -> List[str]:
         """Get portfolio stocks for analysis"""
@@ -33,54 +241,33 @@ class OHLCDashboard:
     def get_portfolio_positions(self) -> pd.DataFrame:
         """Get current portfolio positions"""
         try:
-            conn = sqlite3.connect(self.db_path)
-
-            # Get current positions
-            query = """
-            SELECT 
-                stock,
-                SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) as quantity,
-                SUM(CASE WHEN action = 'buy' THEN total + fees ELSE -(total - fees) END) / 
-                    SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) as avg_cost
-            FROM transactions 
-            GROUP BY stock 
-            HAVING SUM(CASE WHEN action = 'buy' THEN quantity ELSE -quantity END) > 0
-            """
+            with self._pool.reader() as conn:
+                df = _query_frame(conn, POSITIONS_QUERY)
 
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            return df
+            return df.astype(POSITION_DTYPES)
 
         except Exception as e:
             st.error(f"Error loading portfolio positions: {e}")
             return pd.DataFrame()
 
+    def _data_version(self) -> Tuple:
+        """Latest OHLC write time plus a transactions token, to invalidate caches"""
+        # Positions come from transactions, so a buy or sell must also
+        # change the key
+        with self._pool.reader() as conn:
+            return conn.execute(
+                """
+                SELECT
+                    (SELECT MAX(created_at) FROM daily_ohlc),
+                    (SELECT COUNT(*) FROM transactions),
+                    (SELECT MAX(id) FROM transactions)
+            """
+            ).fetchone()
+
     def get_ohlc_summary(self, days: int = 30) -> pd.DataFrame:
         """Get OHLC summary for all portfolio stocks"""
         try:
-            conn = sqlite3.connect(self.db_path)
-
-            query = """
-            SELECT 
-                stock,
-                COUNT(*) as days_with_data,
-                AVG(high_price - low_price) as avg_daily_range,
-                AVG((high_price - low_price) / close_price * 100) as avg_range_pct,
-                MAX(date) as latest_date,
-                AVG(volume) as avg_volume
-            FROM daily_ohlc 
-            WHERE date >= date('now', '-{} days')
-            GROUP BY stock
-            ORDER BY avg_range_pct DESC
-            """.format(
-                days
-            )
-
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            return df
+            return _ohlc_summary(self.db_path, days, self._data_version())
 
         except Exception as e:
             st.error(f"Error loading OHLC summary: {e}")
@@ -89,106 +276,22 @@ class OHLCDashboard:
     def get_optimal_pricing_summary(self, days: int = 30) -> pd.DataFrame:
         """Get optimal pricing opportunities summary"""
         try:
-            conn = sqlite3.connect(self.db_path)
-
-            query = """
-            SELECT 
-                stock,
-                COUNT(*) as analysis_days,
-                AVG(missed_opportunity_buy) as avg_missed_buy,
-                AVG(missed_opportunity_sell) as avg_missed_sell,
-                AVG(price_range_pct) as avg_volatility,
-                SUM(missed_opportunity_buy + missed_opportunity_sell) as total_missed_value,
-                MAX(date) as latest_analysis
-            FROM optimal_pricing_analysis 
-            WHERE date >= date('now', '-{} days')
-            GROUP BY stock
-            ORDER BY total_missed_value DESC
-            """.format(
-                days
-            )
-
-            df = pd.read_sql_query(query, conn)
-            conn.close()
-
-            return df
+            return _optimal_pricing_summary(self.db_path, days, self._data_version())
 
         except Exception as e:
             st.error(f"Error loading optimal pricing summary: {e}")
             return pd.DataFrame()
 
-    def simulate_perfect_timing_portfolio(self, days: int = 30) -> Dict:
+    def simulate_perfect_timing_portfolio(
+        self, days: int = 30
+    ) -> Tuple[pd.DataFrame, Dict]:
         """Simulate portfolio performance with perfect daily timing"""
         try:
-            positions_df = self.get_portfolio_positions()
-            if positions_df.empty:
-                return {}
-
-            conn = sqlite3.connect(self.db_path)
-
-            results = {}
-            total_current_value = 0
-            total_optimal_value = 0
-            total_missed_opportunities = 0
-
-            for _, position in positions_df.iterrows():
-                stock = position["stock"]
-                quantity = position["quantity"]
-                avg_cost = position["avg_cost"]
-
-                # Get latest OHLC data
-                query = """
-                SELECT * FROM daily_ohlc 
-                WHERE stock = ? 
-                ORDER BY date DESC 
-                LIMIT 1
-                """
-
-                ohlc_data = pd.read_sql_query(query, conn, params=(stock,))
-
-                if not ohlc_data.empty:
-                    latest = ohlc_data.iloc[0]
-                    current_price = latest["close_price"]
-                    optimal_sell_price = latest["high_price"]
-
-                    current_value = quantity * current_price
-                    optimal_value = quantity * optimal_sell_price
-                    missed_opportunity = optimal_value - current_value
-
-                    total_current_value += current_value
-                    total_optimal_value += optimal_value
-                    total_missed_opportunities += missed_opportunity
-
-                    results[stock] = {
-                        "quantity": quantity,
-                        "avg_cost": avg_cost,
-                        "current_price": current_price,
-                        "optimal_price": optimal_sell_price,
-                        "current_value": current_value,
-                        "optimal_value": optimal_value,
-                        "missed_opportunity": missed_opportunity,
-                        "cost_basis": quantity * avg_cost,
-                    }
-
-            conn.close()
-
-            # Portfolio summary
-            results["_portfolio_summary"] = {
-                "total_current_value": total_current_value,
-                "total_optimal_value": total_optimal_value,
-                "total_missed_opportunities": total_missed_opportunities,
-                "missed_opportunity_pct": (
-                    (total_missed_opportunities / total_current_value * 100)
-                    if total_current_value > 0
-                    else 0
-                ),
-            }
-
-            return results
+            return _perfect_timing_portfolio(self.db_path, self._data_version())
 
         except Exception as e:
             st.error(f"Error simulating perfect timing: {e}")
-            return {}
+            return pd.DataFrame(), {}
 
     def create_volatility_chart(self, stock: str, days: int = 30) -> go.Figure:
         """Create volatility analysis chart for a stock"""
@@ -197,23 +300,32 @@ class OHLCDashboard:
         if not ohlc_data:
             return None
 
-        # Convert to DataFrame
-        df_data = []
-        for ohlc in ohlc_data:
-            df_data.append(
-                {
-                    "date": ohlc.date,
-                    "open": ohlc.open_price,
-                    "high": ohlc.high_price,
-                    "low": ohlc.low_price,
-                    "close": ohlc.close_price,
-                    "volume": ohlc.volume,
-                    "range_pct": ((ohlc.high_price - ohlc.low_price) / ohlc.close_price)
-                    * 100,
-                }
-            )
+        # Stored data comes back newest first; reverse into chronological order
+        ohlc_data = ohlc_data[::-1]
+        count = len(ohlc_data)
 
-        df = pd.DataFrame(df_data).sort_values("date")
+        # Convert to DataFrame from per-field arrays; float32 is plenty for charting
+        df = pd.DataFrame(
+            {
+                "date": [ohlc.date for ohlc in ohlc_data],
+                "open": np.fromiter(
+                    (ohlc.open_price for ohlc in ohlc_data), np.float32, count
+                ),
+                "high": np.fromiter(
+                    (ohlc.high_price for ohlc in ohlc_data), np.float32, count
+                ),
+                "low": np.fromiter(
+                    (ohlc.low_price for ohlc in ohlc_data), np.float32, count
+                ),
+                "close": np.fromiter(
+                    (ohlc.close_price for ohlc in ohlc_data), np.float32, count
+                ),
+                "volume": np.fromiter(
+                    (ohlc.volume for ohlc in ohlc_data), np.int64, count
+                ),
+            }
+        )
+        df["range_pct"] = (df["high"] - df["low"]) / df["close"] * 100
 
         # Create candlestick chart
         fig = make_subplots(
@@ -266,9 +378,7 @@ class OHLCDashboard:
         if optimal_df.empty:
             return None
 
-        # Sort by total missed value
-        optimal_df = optimal_df.sort_values("total_missed_value", ascending=True)
-
+        # Rows arrive sorted by total missed value (ascending) from the query
         fig = go.Figure()
 
         # Missed buy opportunities (could have bought cheaper)
@@ -307,23 +417,13 @@ class OHLCDashboard:
 
     def create_portfolio_optimization_chart(self) -> go.Figure:
         """Create portfolio optimization visualization"""
-        perfect_timing = self.simulate_perfect_timing_portfolio()
+        perfect_timing, summary = self.simulate_perfect_timing_portfolio()
 
-        if not perfect_timing or "_portfolio_summary" not in perfect_timing:
+        if perfect_timing.empty:
             return None
 
-        # Prepare data for visualization
-        stocks = []
-        current_values = []
-        optimal_values = []
-        missed_opps = []
-
-        for stock, data in perfect_timing.items():
-            if stock != "_portfolio_summary":
-                stocks.append(stock)
-                current_values.append(data["current_value"])
-                optimal_values.append(data["optimal_value"])
-                missed_opps.append(data["missed_opportunity"])
+        stocks = perfect_timing["stock"].values
+        optimal_values = perfect_timing["optimal_value"].values
 
         fig = go.Figure()
 
@@ -331,7 +431,7 @@ class OHLCDashboard:
         fig.add_trace(
             go.Bar(
                 x=stocks,
-                y=current_values,
+                y=perfect_timing["current_value"].values,
                 name="Current Value",
                 marker_color="blue",
                 opacity=0.7,
@@ -350,10 +450,12 @@ class OHLCDashboard:
         )
 
         # Add missed opportunity annotations
-        for i, (stock, missed) in enumerate(zip(stocks, missed_opps)):
+        for stock, optimal, missed in zip(
+            stocks, optimal_values, perfect_timing["missed_opportunity"].values
+        ):
             fig.add_annotation(
                 x=stock,
-                y=optimal_values[i],
+                y=optimal,
                 text=f"+${missed:.0f}",
                 showarrow=True,
                 arrowhead=2,
@@ -361,8 +463,6 @@ class OHLCDashboard:
                 font=dict(color="red", size=10),
             )
 
-        summary = perfect_timing["_portfolio_summary"]
-
         fig.update_layout(
             title=f"Portfolio: Current vs Perfect Timing<br>"
             f'<sub>Total Missed Opportunity: ${summary["total_missed_opportunities"]:.0f} '
@@ -376,12 +476,206 @@ class OHLCDashboard:
         return fig
 
 
+@st.fragment
+def _tab_overview(ohlc_summary: pd.DataFrame, portfolio_stocks: List[str]):
+    """Portfolio overview tab"""
+    st.subheader("Portfolio OHLC Overview")
+
+    # Summary metrics
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(
+            "Stocks with OHLC Data",
+            len(ohlc_summary),
+            delta=f"out of {len(portfolio_stocks)}",
+        )
+
+    with col2:
+        avg_volatility = ohlc_summary["avg_range_pct"].mean()
+        st.metric("Average Daily Volatility", f"{avg_volatility:.2f}%")
+
+    with col3:
+        latest_date = ohlc_summary["latest_date"].max()
+        st.metric("Latest OHLC Data", latest_date)
+
+    # OHLC Summary Table
+    st.subheader("OHLC Data Summary")
+
+    display_df = ohlc_summary.copy()
+    display_df["avg_daily_range"] = _format_price(display_df["avg_daily_range"])
+    display_df["avg_range_pct"] = np.char.mod(
+        "%.2f%%", display_df["avg_range_pct"].to_numpy(dtype=np.float64)
+    )
+    display_df["avg_volume"] = [
+        f"{v:,}"
+        for v in np.rint(display_df["avg_volume"].to_numpy(dtype=np.float64))
+        .astype(np.int64)
+        .tolist()
+    ]
+
+    display_df.columns = [
+        "Stock",
+        "Days of Data",
+        "Avg Daily Range",
+        "Avg Volatility %",
+        "Latest Date",
+        "Avg Volume",
+    ]
+
+    st.dataframe(display_df, use_container_width=True)
+
+
+@st.fragment
+def _tab_perfect_timing(dashboard: OHLCDashboard):
+    """Perfect timing analysis tab"""
+    st.subheader("🎯 Perfect Timing Analysis")
+
+    # Portfolio optimization chart
+    opt_chart = dashboard.create_portfolio_optimization_chart()
+    if opt_chart:
+        st.plotly_chart(opt_chart, use_container_width=True)
+
+    # Missed opportunities breakdown
+    missed_chart = dashboard.create_missed_opportunities_chart()
+    if missed_chart:
+        st.plotly_chart(missed_chart, use_container_width=True)
+
+    # Perfect timing simulation details
+    _, summary = dashboard.simulate_perfect_timing_portfolio()
+
+    if summary:
+        st.subheader("Perfect Timing Summary")
+
+        col1, col2, col3, col4 = st.columns(4)
+
+        with col1:
+            st.metric(
+                "Current Portfolio Value", f"${summary['total_current_value']:,.0f}"
+            )
+
+        with col2:
+            st.metric("Perfect Timing Value", f"${summary['total_optimal_value']:,.0f}")
+
+        with col3:
+            st.metric(
+                "Missed Opportunity",
+                f"${summary['total_missed_opportunities']:,.0f}",
+                delta=f"{summary['missed_opportunity_pct']:.1f}%",
+            )
+
+        with col4:
+            improvement = (
+                (summary["total_optimal_value"] / summary["total_current_value"]) - 1
+            ) * 100
+            st.metric("Potential Improvement", f"{improvement:.1f}%")
+
+
+@st.fragment
+def _tab_stock_analysis(dashboard: OHLCDashboard, portfolio_stocks: List[str]):
+    """Individual stock analysis tab"""
+    st.subheader("📈 Individual Stock Analysis")
+
+    # Stock selector
+    selected_stock = st.selectbox("Select Stock for Analysis", portfolio_stocks)
+
+    if selected_stock:
+        # Volatility chart
+        vol_chart = dashboard.create_volatility_chart(selected_stock)
+        if vol_chart:
+            st.plotly_chart(vol_chart, use_container_width=True)
+
+        # Stock-specific metrics
+        stock_ohlc = dashboard.collector.get_ohlc_data(selected_stock, 30)
+        stock_optimal = dashboard.collector.get_optimal_pricing_analysis(
+            selected_stock, 30
+        )
+
+        if stock_ohlc and stock_optimal:
+            col1, col2 = st.columns(2)
+
+            with col1:
+                st.subheader("Recent OHLC Data")
+
+                recent = stock_ohlc[:10]  # Last 10 days
+                recent_df = pd.DataFrame(
+                    {
+                        "Date": [ohlc.date for ohlc in recent],
+                        "Open": _format_price([ohlc.open_price for ohlc in recent]),
+                        "High": _format_price([ohlc.high_price for ohlc in recent]),
+                        "Low": _format_price([ohlc.low_price for ohlc in recent]),
+                        "Close": _format_price([ohlc.close_price for ohlc in recent]),
+                        "Volume": pd.Series([ohlc.volume for ohlc in recent]).map(
+                            "{:,}".format
+                        ),
+                    }
+                )
+
+                st.dataframe(recent_df, use_container_width=True)
+
+            with col2:
+                st.subheader("Optimal Pricing Analysis")
+
+                recent_optimal = stock_optimal[:10]  # Last 10 days
+                optimal_df = pd.DataFrame(
+                    {
+                        "Date": [opt.date for opt in recent_optimal],
+                        "Close": _format_price(
+                            [opt.actual_close for opt in recent_optimal]
+                        ),
+                        "Best Buy": _format_price(
+                            [opt.optimal_buy_price for opt in recent_optimal]
+                        ),
+                        "Best Sell": _format_price(
+                            [opt.optimal_sell_price for opt in recent_optimal]
+                        ),
+                        "Missed Buy": _format_price(
+                            [opt.missed_opportunity_buy for opt in recent_optimal]
+                        ),
+                        "Missed Sell": _format_price(
+                            [opt.missed_opportunity_sell for opt in recent_optimal]
+                        ),
+                    }
+                )
+
+                st.dataframe(optimal_df, use_container_width=True)
+
+
+@st.fragment
+def _tab_order_simulation():
+    """Order simulation tab"""
+    st.subheader("⚙️ Order Simulation")
+
+    st.info("🚧 Order simulation features coming soon!")
+
+    st.markdown(
+        """
+    **Planned Features:**
+    - Stop-limit order simulation
+    - Automated trading strategy backtesting  
+    - Risk-adjusted order sizing
+    - Multi-day strategy optimization
+    - Portfolio rebalancing simulation
+    """
+    )
+
+    # Placeholder for future order simulation interface
+    if st.button("🎲 Simulate Random Stop-Limit Orders"):
+        st.success("Simulation feature in development!")
+
+
+@st.cache_resource
+def _get_dashboard(db_path: str = "portfolio.db") -> OHLCDashboard:
+    """Dashboard (and its collector) shared across Streamlit reruns"""
+    return OHLCDashboard(db_path)
+
+
 def create_ohlc_dashboard():
     """Main OHLC dashboard interface"""
 
     st.header("📈 OHLC Analysis & Order Simulation")
 
-    dashboard = OHLCDashboard()
+    dashboard = _get_dashboard()
 
     # Check if OHLC data is available
     if not dashboard.collector.is_enabled():
@@ -417,14 +711,12 @@ def create_ohlc_dashboard():
         with col1:
             if st.button("🚀 Collect OHLC Data Now"):
                 with st.spinner("Collecting OHLC data..."):
-                    from ohlc_collector import OHLCCollector
-
-                    collector = OHLCCollector()
-                    results = collector.collect_portfolio_ohlc(
+                    results = dashboard.collector.collect_portfolio_ohlc(
                         portfolio_stocks, prefer_yfinance=True
                     )
 
                     successful = sum(1 for success in results.values() if success)
+                    st.cache_data.clear()
                     st.success(
                         f"✅ Collected OHLC data for {successful}/{len(portfolio_stocks)} stocks"
                     )
@@ -447,173 +739,18 @@ def create_ohlc_dashboard():
         ]
     )
 
+    # Each tab is a fragment, so its widgets rerun only that tab
     with tab1:
-        st.subheader("Portfolio OHLC Overview")
-
-        # Summary metrics
-        col1, col2, col3 = st.columns(3)
-
-        with col1:
-            st.metric(
-                "Stocks with OHLC Data",
-                len(ohlc_summary),
-                delta=f"out of {len(portfolio_stocks)}",
-            )
-
-        with col2:
-            avg_volatility = ohlc_summary["avg_range_pct"].mean()
-            st.metric("Average Daily Volatility", f"{avg_volatility:.2f}%")
-
-        with col3:
-            latest_date = ohlc_summary["latest_date"].max()
-            st.metric("Latest OHLC Data", latest_date)
-
-        # OHLC Summary Table
-        st.subheader("OHLC Data Summary")
-
-        display_df = ohlc_summary.copy()
-        display_df["avg_daily_range"] = display_df["avg_daily_range"].apply(
-            lambda x: f"${x:.3f}"
-        )
-        display_df["avg_range_pct"] = display_df["avg_range_pct"].apply(
-            lambda x: f"{x:.2f}%"
-        )
-        display_df["avg_volume"] = display_df["avg_volume"].apply(lambda x: f"{x:,.0f}")
-
-        display_df.columns = [
-            "Stock",
-            "Days of Data",
-            "Avg Daily Range",
-            "Avg Volatility %",
-            "Latest Date",
-            "Avg Volume",
-        ]
-
-        st.dataframe(display_df, use_container_width=True)
+        _tab_overview(ohlc_summary, portfolio_stocks)
 
     with tab2:
-        st.subheader("🎯 Perfect Timing Analysis")
-
-        # Portfolio optimization chart
-        opt_chart = dashboard.create_portfolio_optimization_chart()
-        if opt_chart:
-            st.plotly_chart(opt_chart, use_container_width=True)
-
-        # Missed opportunities breakdown
-        missed_chart = dashboard.create_missed_opportunities_chart()
-        if missed_chart:
-            st.plotly_chart(missed_chart, use_container_width=True)
-
-        # Perfect timing simulation details
-        perfect_timing = dashboard.simulate_perfect_timing_portfolio()
-
-        if perfect_timing and "_portfolio_summary" in perfect_timing:
-            summary = perfect_timing["_portfolio_summary"]
-
-            st.subheader("Perfect Timing Summary")
-
-            col1, col2, col3, col4 = st.columns(4)
-
-            with col1:
-                st.metric(
-                    "Current Portfolio Value", f"${summary['total_current_value']:,.0f}"
-                )
-
-            with col2:
-                st.metric(
-                    "Perfect Timing Value", f"${summary['total_optimal_value']:,.0f}"
-                )
-
-            with col3:
-                st.metric(
-                    "Missed Opportunity",
-                    f"${summary['total_missed_opportunities']:,.0f}",
-                    delta=f"{summary['missed_opportunity_pct']:.1f}%",
-                )
-
-            with col4:
-                improvement = (
-                    (summary["total_optimal_value"] / summary["total_current_value"])
-                    - 1
-                ) * 100
-                st.metric("Potential Improvement", f"{improvement:.1f}%")
+        _tab_perfect_timing(dashboard)
 
     with tab3:
-        st.subheader("📈 Individual Stock Analysis")
-
-        # Stock selector
-        selected_stock = st.selectbox("Select Stock for Analysis", portfolio_stocks)
-
-        if selected_stock:
-            # Volatility chart
-            vol_chart = dashboard.create_volatility_chart(selected_stock)
-            if vol_chart:
-                st.plotly_chart(vol_chart, use_container_width=True)
-
-            # Stock-specific metrics
-            stock_ohlc = dashboard.collector.get_ohlc_data(selected_stock, 30)
-            stock_optimal = dashboard.collector.get_optimal_pricing_analysis(
-                selected_stock, 30
-            )
-
-            if stock_ohlc and stock_optimal:
-                col1, col2 = st.columns(2)
-
-                with col1:
-                    st.subheader("Recent OHLC Data")
-
-                    recent_data = []
-                    for ohlc in stock_ohlc[:10]:  # Last 10 days
-                        recent_data.append(
-                            {
-                                "Date": ohlc.date,
-                                "Open": f"${ohlc.open_price:.3f}",
-                                "High": f"${ohlc.high_price:.3f}",
-                                "Low": f"${ohlc.low_price:.3f}",
-                                "Close": f"${ohlc.close_price:.3f}",
-                                "Volume": f"{ohlc.volume:,}",
-                            }
-                        )
-
-                    st.dataframe(pd.DataFrame(recent_data), use_container_width=True)
-
-                with col2:
-                    st.subheader("Optimal Pricing Analysis")
-
-                    optimal_data = []
-                    for opt in stock_optimal[:10]:  # Last 10 days
-                        optimal_data.append(
-                            {
-                                "Date": opt.date,
-                                "Close": f"${opt.actual_close:.3f}",
-                                "Best Buy": f"${opt.optimal_buy_price:.3f}",
-                                "Best Sell": f"${opt.optimal_sell_price:.3f}",
-                                "Missed Buy": f"${opt.missed_opportunity_buy:.3f}",
-                                "Missed Sell": f"${opt.missed_opportunity_sell:.3f}",
-                            }
-                        )
-
-                    st.dataframe(pd.DataFrame(optimal_data), use_container_width=True)
+        _tab_stock_analysis(dashboard, portfolio_stocks)
 
     with tab4:
-        st.subheader("⚙️ Order Simulation")
-
-        st.info("🚧 Order simulation features coming soon!")
-
-        st.markdown(
-            """
-        **Planned Features:**
-        - Stop-limit order simulation
-        - Automated trading strategy backtesting  
-        - Risk-adjusted order sizing
-        - Multi-day strategy optimization
-        - Portfolio rebalancing simulation
-        """
-        )
-
-        # Placeholder for future order simulation interface
-        if st.button("🎲 Simulate Random Stop-Limit Orders"):
-            st.success("Simulation feature in development!")
+        _tab_order_simulation()
 
 
 if __name__ == "__main__":
@@ -4,140 +4,197 @@ Performance Attribution Analysis
 Analyzes which stocks contributed most to portfolio performance vs ASX200
 """
 
-import sqlite3
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Dict, Tuple
 
 import numpy as np
 import pandas as pd
-import plotly.express as px  # type: ignore
-import plotly.graph_objects as go  # type: ignore
-from plotly.subplots import make_subplots  # type: ignore
 
-from portfolio_tracker import \
-    ASXPortfolioTracker  # Import for consistent pricing
+from portfolio_tracker import (  # Import for consistent pricing
+    ASXPortfolioTracker,
+    positions_to_array,
+)
+
+# Inputs are only displayed, so they are stored compactly; derived metrics stay float64
+ATTRIBUTION_DTYPES = {
+    "stock": "category",
+    "quantity": "int32",
+    "total_cost": "float32",
+    "avg_cost": "float32",
+    "current_price": "float32",
+}
+
+CHART_TEMPLATE = "asx_attribution"
+
+WATERFALL_HOVER = "<b>%{x}</b><br>Contribution: %{y:.3f}%<br><extra></extra>"
+TREEMAP_HOVER = (
+    "<b>%{label}</b><br>"
+    "Position Value: $%{value:,.0f}<br>"
+    "Return: %{color:.2f}%<br>"
+    "<extra></extra>"
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _chart_template() -> str:
+    """Register the shared chart styling on first use so each figure just names it"""
+    import plotly.graph_objects as go  # type: ignore
+    import plotly.io as pio  # type: ignore
+
+    template = go.layout.Template(pio.templates["plotly_white"])
+    template.layout.height = 600
+    pio.templates[CHART_TEMPLATE] = template
+    return CHART_TEMPLATE
+
+
+def _db_mtime(db_path: str = "portfolio.db") -> float:
+    """Latest modification time of the database, including its WAL file"""
+    paths = (db_path, f"{db_path}-wal")
+    return max((os.path.getmtime(p) for p in paths if os.path.exists(p)), default=0.0)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tracker() -> ASXPortfolioTracker:
+    """Tracker shared by attribution reads, so schema setup runs once per process"""
+    return ASXPortfolioTracker()
+
+
+def _attribution_kernel(
+    quantity: np.ndarray, avg_cost: np.ndarray, current_price: np.ndarray
+) -> Tuple[Dict[str, float], Dict[str, np.ndarray]]:
+    """Portfolio totals and per-stock attribution metrics from position arrays"""
+    total_cost = quantity * avg_cost
+    current_value = quantity * current_price
+    unrealized_pnl = current_value - total_cost
+
+    # Only calculate returns for stocks with a valid price and cost (others stay 0)
+    priced = (current_price > 0) & (avg_cost > 0)
+    return_pct = np.divide(
+        current_price, avg_cost, out=np.ones_like(current_price), where=priced
+    )
+    return_pct -= 1
+    return_pct *= 100
 
+    # All portfolio totals in a single reduction pass
+    total_portfolio_value, total_cost_basis, total_unrealized_pnl = np.add.reduce(
+        np.vstack((current_value, total_cost, unrealized_pnl)), axis=1
+    )
 
-def calculate_stock_contributions():
+    # Weight in portfolio and contribution to total return (zero if unpriced)
+    if total_portfolio_value > 0:
+        weight = current_value / total_portfolio_value * 100
+        contribution_to_return = unrealized_pnl / total_cost_basis * 100
+        total_contribution = total_unrealized_pnl / total_cost_basis * 100
+    else:
+        weight = np.zeros_like(current_value)
+        contribution_to_return = np.zeros_like(current_value)
+        total_contribution = 0.0
+
+    totals = {
+        "total_portfolio_value": float(total_portfolio_value),
+        "total_cost": float(total_cost_basis),
+        "total_unrealized_pnl": float(total_unrealized_pnl),
+        "total_contribution": float(total_contribution),
+    }
+
+    return totals, {
+        "total_cost": total_cost,
+        "current_value": current_value,
+        "unrealized_pnl": unrealized_pnl,
+        "return_pct": return_pct,
+        "weight": weight,
+        "contribution_to_return": contribution_to_return,
+    }
+
+
+def calculate_stock_contributions(use_api: bool = False):
     """Calculate each stock's contribution to total portfolio performance"""
+    # Reuse the last result until portfolio.db changes; copy since callers mutate
+    return _attribution_cached(_db_mtime(), use_api).copy()
+
+
+@functools.lru_cache(maxsize=4)
+def _attribution_cached(db_mtime: float, use_api: bool):
+    """Attribution frame for a given database state"""
 
     # Use ASXPortfolioTracker for consistent price retrieval (same as CLI dashboard)
-    tracker = ASXPortfolioTracker()
+    tracker = _get_tracker()
 
     # Force price update to ensure we have current prices (same as CLI --update)
-    positions = tracker.update_current_prices(use_api=False, force=False)
-
-    # Convert to DataFrame format for existing analysis logic
-    positions_data = []
-    latest_price_data = []
-
-    for stock, pos in positions.items():
-        positions_data.append(
-            {
-                "stock": stock,
-                "quantity": pos.quantity,
-                "total_cost": pos.avg_cost * pos.quantity,
-                "avg_cost": pos.avg_cost,  # Add avg_cost explicitly for return calculation
-            }
-        )
-        latest_price_data.append({"stock": stock, "current_price": pos.current_price})
-
-    positions_df = pd.DataFrame(positions_data)
-    latest_prices_df = pd.DataFrame(latest_price_data)
-
-    # Connect to database for historical data only
-    conn = sqlite3.connect("portfolio.db")
-
-    # Get initial prices (first available price for each stock)
-    initial_prices_df = pd.read_sql_query(
-        """
-        SELECT DISTINCT stock, price as initial_price
-        FROM price_history ph1
-        WHERE date = (
-            SELECT MIN(date) 
-            FROM price_history ph2 
-            WHERE ph2.stock = ph1.stock
-        )
-    """,
-        conn,
-    )
+    positions = tracker.update_current_prices(use_api=use_api, force=False)
 
-    conn.close()
+    # Per-field arrays, aligned by position order
+    arr = positions_to_array(positions)
+    count = len(arr)
+    stocks = arr["stock"]
+    quantity = arr["quantity"].astype(np.float64)
+    avg_cost = arr["avg_cost"]
+    current_price = arr["current_price"]
 
     # Debug: Check if we have data
-    if positions_df.empty:
+    if count == 0:
         print("ERROR: No positions data found!")
         return pd.DataFrame()
 
-    if latest_prices_df.empty:
-        print("ERROR: No price data found!")
-        return pd.DataFrame()
-
-    # Merge price data (we already have avg_cost from positions, so skip the initial_prices merge)
-    attribution_df = positions_df.merge(latest_prices_df, on="stock", how="left")
-
     # Debug: Check for missing price data
-    missing_prices = attribution_df[attribution_df["current_price"].isna()]
-    if not missing_prices.empty:
-        print(
-            f"WARNING: Missing current prices for: {missing_prices['stock'].tolist()}"
-        )
-
-    # Fill NaN prices with 0 temporarily to debug
-    attribution_df["current_price"] = attribution_df["current_price"].fillna(0)
+    valid_prices = current_price > 0
+    if not valid_prices.all():
+        print(f"WARNING: Missing current prices for: {stocks[~valid_prices].tolist()}")
 
-    # Calculate metrics for each stock
-    attribution_df["current_value"] = (
-        attribution_df["quantity"] * attribution_df["current_price"]
-    )
-    attribution_df["unrealized_pnl"] = (
-        attribution_df["current_value"] - attribution_df["total_cost"]
-    )
+    totals, metrics = _attribution_kernel(quantity, avg_cost, current_price)
 
-    # Only calculate returns for stocks with valid prices
-    attribution_df["return_pct"] = 0.0
-    valid_prices = attribution_df["current_price"] > 0
-    attribution_df.loc[valid_prices, "return_pct"] = (
-        attribution_df.loc[valid_prices, "current_price"]
-        / attribution_df.loc[valid_prices, "avg_cost"]
-        - 1
-    ) * 100
-
-    # Calculate weight in portfolio
-    total_portfolio_value = attribution_df["current_value"].sum()
+    total_portfolio_value = totals["total_portfolio_value"]
     if total_portfolio_value <= 0:
         print(f"ERROR: Total portfolio value is still {total_portfolio_value}")
         print("ERROR: This means current_price values are all 0 or NaN")
-        # Return a placeholder DataFrame so we can see what's wrong
-        attribution_df["weight"] = 0.0
-        attribution_df["contribution_to_return"] = 0.0
-        return attribution_df
-
-    attribution_df["weight"] = (
-        attribution_df["current_value"] / total_portfolio_value * 100
-    )
-
-    # Calculate contribution to total return
-    attribution_df["contribution_to_return"] = (
-        attribution_df["unrealized_pnl"] / attribution_df["total_cost"].sum()
-    ) * 100
-
-    # Sort by contribution
-    attribution_df = attribution_df.sort_values(
-        "contribution_to_return", ascending=False
-    )
+        # Placeholder values (left unsorted) so we can see what's wrong
+        order = np.arange(count)
+    else:
+        # Sort by contribution
+        order = np.argsort(-metrics["contribution_to_return"], kind="stable")
+
+    # Assemble the result once, already in report order
+    columns = {
+        "stock": stocks,
+        "quantity": quantity,
+        "total_cost": metrics["total_cost"],
+        "avg_cost": avg_cost,
+        "current_price": current_price,
+        "current_value": metrics["current_value"],
+        "unrealized_pnl": metrics["unrealized_pnl"],
+        "return_pct": metrics["return_pct"],
+        "weight": metrics["weight"],
+        "contribution_to_return": metrics["contribution_to_return"],
+    }
+    attribution_df = pd.DataFrame(
+        {name: values[order] for name, values in columns.items()}, index=order
+    ).astype(ATTRIBUTION_DTYPES)
+    # Totals travel with the frame so reports don't re-reduce its columns
+    attribution_df.attrs["totals"] = totals
 
     return attribution_df
 
 
 def create_attribution_waterfall_chart(attribution_df):
     """Create a waterfall chart showing stock contributions"""
+    import plotly.graph_objects as go  # type: ignore
 
     # Prepare data for waterfall chart
     stocks = attribution_df["stock"].tolist()
     contributions = attribution_df["contribution_to_return"].tolist()
 
     # Create waterfall chart
-    fig = go.Figure()
+    fig = go.Figure(
+        layout=dict(
+            title="Stock Performance Attribution - Contribution to Total Return",
+            xaxis_title="Stock",
+            yaxis_title="Contribution to Portfolio Return (%)",
+            template=_chart_template(),
+        )
+    )
 
     # Add bars for each stock
     colors = ["green" if x > 0 else "red" for x in contributions]
@@ -148,21 +205,10 @@ def create_attribution_waterfall_chart(attribution_df):
             y=contributions,
             marker_color=colors,
             name="Contribution to Return",
-            hovertemplate="<b>%{x}</b><br>"
-            + "Contribution: %{y:.3f}%<br>"
-            + "<extra></extra>",
+            hovertemplate=WATERFALL_HOVER,
         )
     )
 
-    # Update layout
-    fig.update_layout(
-        title="Stock Performance Attribution - Contribution to Total Return",
-        xaxis_title="Stock",
-        yaxis_title="Contribution to Portfolio Return (%)",
-        template="plotly_white",
-        height=600,
-    )
-
     # Add zero line
     fig.add_hline(y=0, line_dash="dash", line_color="gray", opacity=0.5)
 
@@ -171,35 +217,37 @@ def create_attribution_waterfall_chart(attribution_df):
 
 def create_attribution_treemap(attribution_df):
     """Create a treemap showing position sizes and performance"""
+    import plotly.express as px  # type: ignore
 
-    # Prepare data - use absolute values for size, color for performance
-    attribution_df["abs_value"] = attribution_df["current_value"].abs()
+    # Size by position value, color by performance; long-only positions are
+    # already non-negative, so absolute values are only needed for shorts
+    if (attribution_df["current_value"] < 0).any():
+        attribution_df = attribution_df.assign(
+            current_value=attribution_df["current_value"].abs()
+        )
 
     # Create treemap
     fig = px.treemap(
         attribution_df,
         path=["stock"],
-        values="abs_value",
+        values="current_value",
         color="return_pct",
         color_continuous_scale="RdYlGn",
         color_continuous_midpoint=0,
         title="Portfolio Holdings - Size & Performance",
-        labels={"return_pct": "Return %", "abs_value": "Position Value ($)"},
+        labels={"return_pct": "Return %", "current_value": "Position Value ($)"},
+        template=_chart_template(),
     )
 
     # Update hover template
-    fig.update_traces(
-        hovertemplate="<b>%{label}</b><br>"
-        + "Position Value: $%{value:,.0f}<br>"
-        + "Return: %{color:.2f}%<br>"
-        + "<extra></extra>"
-    )
+    fig.update_traces(hovertemplate=TREEMAP_HOVER)
 
     return fig
 
 
 def create_attribution_scatter(attribution_df):
     """Create scatter plot of weight vs return"""
+    import plotly.express as px  # type: ignore
 
     fig = px.scatter(
         attribution_df,
@@ -216,6 +264,7 @@ def create_attribution_scatter(attribution_df):
         title="Position Weight vs Performance",
         color_continuous_scale="RdYlGn",
         color_continuous_midpoint=0,
+        template=_chart_template(),
     )
 
     # Add quadrant lines
@@ -227,13 +276,30 @@ def create_attribution_scatter(attribution_df):
         opacity=0.5,
     )
 
-    # Update layout
-    fig.update_layout(template="plotly_white", height=600)
-
     return fig
 
 
-def generate_attribution_report():
+def _render_chart(fig, filename: str, save_png: bool = False) -> str:
+    """Write a chart as HTML, plus a PNG snapshot if requested"""
+    # Load plotly.js from the CDN rather than embedding ~3MB in every file
+    fig.write_html(filename, include_plotlyjs="cdn")
+    # PNG export spawns Kaleido's headless browser, so it is opt-in
+    if save_png:
+        fig.write_image(filename.replace(".html", ".png"))
+    return filename
+
+
+def _sign_groups(values: pd.Series):
+    """Count and sum of negative, zero and positive values in one pass"""
+    values = values.to_numpy(dtype=np.float64)
+    # NaN lands in the zero bucket, which the report never prints
+    groups = np.sign(np.nan_to_num(values)).astype(np.intp) + 1
+    counts = np.bincount(groups, minlength=3)
+    sums = np.bincount(groups, weights=values, minlength=3)
+    return counts, sums
+
+
+def generate_attribution_report(save_png: bool = False):
     """Generate comprehensive attribution analysis"""
 
     print("📊 Calculating performance attribution...")
@@ -265,52 +331,62 @@ def generate_attribution_report():
 
     # Portfolio composition
     print(f"\n📊 PORTFOLIO COMPOSITION:")
-    print(f"Total Portfolio Value: ${attribution_df['current_value'].sum():,.2f}")
-    print(f"Total Unrealized P&L: ${attribution_df['unrealized_pnl'].sum():,.2f}")
-    print(
-        f"Weighted Average Return: {(attribution_df['contribution_to_return']).sum():.2f}%"
-    )
+    totals = attribution_df.attrs["totals"]
+    print(f"Total Portfolio Value: ${totals['total_portfolio_value']:,.2f}")
+    print(f"Total Unrealized P&L: ${totals['total_unrealized_pnl']:,.2f}")
+    print(f"Weighted Average Return: {totals['total_contribution']:.2f}%")
 
     # Detailed breakdown
     print(f"\n📋 DETAILED BREAKDOWN:")
     print(f"{'Stock':<6} {'Weight':<8} {'Return':<8} {'Contribution':<12} {'P&L':<12}")
     print("-" * 60)
 
-    for _, row in attribution_df.iterrows():
-        print(
-            f"{row['stock']:<6} {row['weight']:<8.2f}% {row['return_pct']:<8.2f}% "
-            f"{row['contribution_to_return']:<12.3f}% ${row['unrealized_pnl']:<12.0f}"
+    columns = [
+        "stock",
+        "weight",
+        "return_pct",
+        "contribution_to_return",
+        "unrealized_pnl",
+    ]
+    rows = zip(*(attribution_df[col].tolist() for col in columns))
+    print(
+        "\n".join(
+            f"{stock:<6} {weight:<8.2f}% {return_pct:<8.2f}% "
+            f"{contribution:<12.3f}% ${pnl:<12.0f}"
+            for stock, weight, return_pct, contribution, pnl in rows
         )
+    )
 
     # Create visualizations
     print(f"\n📊 Generating attribution charts...")
 
-    # Waterfall chart
-    waterfall_fig = create_attribution_waterfall_chart(attribution_df)
-    waterfall_filename = (
-        f"attribution_waterfall_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    )
-    waterfall_fig.write_html(waterfall_filename)
-    waterfall_fig.write_image(waterfall_filename.replace(".html", ".png"))
-    print(f"✅ Waterfall chart saved as {waterfall_filename}")
-
-    # Treemap
-    treemap_fig = create_attribution_treemap(attribution_df)
-    treemap_filename = (
-        f"attribution_treemap_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    )
-    treemap_fig.write_html(treemap_filename)
-    treemap_fig.write_image(treemap_filename.replace(".html", ".png"))
-    print(f"✅ Treemap chart saved as {treemap_filename}")
-
-    # Scatter plot
-    scatter_fig = create_attribution_scatter(attribution_df)
-    scatter_filename = (
-        f"attribution_scatter_{datetime.now().strftime('%Y%m%d_%H%M%S')}.html"
-    )
-    scatter_fig.write_html(scatter_filename)
-    scatter_fig.write_image(scatter_filename.replace(".html", ".png"))
-    print(f"✅ Scatter plot saved as {scatter_filename}")
+    charts = [
+        (
+            "Waterfall chart",
+            "attribution_waterfall",
+            create_attribution_waterfall_chart,
+        ),
+        ("Treemap chart", "attribution_treemap", create_attribution_treemap),
+        ("Scatter plot", "attribution_scatter", create_attribution_scatter),
+    ]
+
+    # One timestamp so the files from a single run share a suffix
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Rendering (Kaleido image export in particular) is independent per chart
+    with ThreadPoolExecutor(max_workers=len(charts)) as executor:
+        futures = [
+            executor.submit(
+                _render_chart,
+                create_chart(attribution_df),
+                f"{prefix}_{timestamp}.html",
+                save_png,
+            )
+            for _, prefix, create_chart in charts
+        ]
+
+        for (label, _, _), future in zip(charts, futures):
+            print(f"✅ {label} saved as {future.result()}")
 
     # Summary insights
     print(f"\n🎯 KEY INSIGHTS:")
@@ -320,33 +396,41 @@ def generate_attribution_report():
     print(f"• Top 3 positions represent {top_3_weight:.1f}% of portfolio")
 
     # Winner/loser analysis
-    winners = attribution_df[attribution_df["return_pct"] > 0]
-    losers = attribution_df[attribution_df["return_pct"] < 0]
+    return_counts, return_sums = _sign_groups(attribution_df["return_pct"])
 
-    if len(winners) > 0:
+    if return_counts[2] > 0:
         print(
-            f"• {len(winners)} positions are profitable (avg return: {winners['return_pct'].mean():.2f}%)"
+            f"• {return_counts[2]} positions are profitable (avg return: {return_sums[2] / return_counts[2]:.2f}%)"
         )
-    if len(losers) > 0:
+    if return_counts[0] > 0:
         print(
-            f"• {len(losers)} positions are losing (avg return: {losers['return_pct'].mean():.2f}%)"
+            f"• {return_counts[0]} positions are losing (avg return: {return_sums[0] / return_counts[0]:.2f}%)"
         )
 
     # Contribution analysis
-    positive_contributors = attribution_df[attribution_df["contribution_to_return"] > 0]
-    negative_contributors = attribution_df[attribution_df["contribution_to_return"] < 0]
+    contribution_counts, contribution_sums = _sign_groups(
+        attribution_df["contribution_to_return"]
+    )
 
-    if len(positive_contributors) > 0:
+    if contribution_counts[2] > 0:
         print(
-            f"• {len(positive_contributors)} stocks contributed positively (+{positive_contributors['contribution_to_return'].sum():.3f}%)"
+            f"• {contribution_counts[2]} stocks contributed positively (+{contribution_sums[2]:.3f}%)"
         )
-    if len(negative_contributors) > 0:
+    if contribution_counts[0] > 0:
         print(
-            f"• {len(negative_contributors)} stocks contributed negatively ({negative_contributors['contribution_to_return'].sum():.3f}%)"
+            f"• {contribution_counts[0]} stocks contributed negatively ({contribution_sums[0]:.3f}%)"
         )
 
     return attribution_df
 
 
 if __name__ == "__main__":
-    generate_attribution_report()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Performance Attribution Analysis")
+    parser.add_argument(
+        "--png", action="store_true", help="Also save PNG snapshots of each chart"
+    )
+    args = parser.parse_args()
+
+    generate_attribution_report(save_png=args.png)
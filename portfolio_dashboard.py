@@ -4,62 +4,87 @@ Portfolio Dashboard - Command line interface for ASX portfolio tracking
 """
 
 import argparse
+import csv
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
 from config import EODHD_API_KEY
 from dividend_tracker import DividendTracker, populate_sample_dividends
-from portfolio_tracker import ASXPortfolioTracker
+from portfolio_tracker import (
+    PRICE_FETCH_WORKERS,
+    ASXPortfolioTracker,
+    asx_today,
+    portfolio_totals,
+    positions_to_array,
+)
 
-# CGT imports - handle gracefully if not available
-try:
-    from cgt_calculator import CGTCalculator, generate_cgt_report
 
-    CGT_AVAILABLE = True
-except ImportError:
-    CGT_AVAILABLE = False
-    CGTCalculator = None  # type: ignore
-    generate_cgt_report = None  # type: ignore
+# Row template for the --details position table
+POSITION_ROW_FMT = (
+    "{stock:<6} {qty:<6} ${avg:<9.4f} ${cur:<9.4f} ${mv:<11.2f} "
+    "${pnl:<11.2f} {pct:<7.2f}% {ind}"
+)
 
 
-def print_portfolio_summary(
-    tracker: ASXPortfolioTracker,
-    show_details: bool = False,
-    use_api: bool = False,
-    force_update: bool = False,
-):
+# CGT support is optional and only needed by the --cgt flags, so load it lazily
+def _load_cgt():
+    """Import the CGT module on first use; None if it isn't available"""
+    try:
+        import cgt_calculator
+    except ImportError:
+        return None
+    return cgt_calculator
+
+
+@lru_cache(maxsize=None)
+def _get_cgt_calculator(db_path: str):
+    """Build the CGT calculator and its tax parcels once per run"""
+    cgt_calc = _load_cgt().CGTCalculator(db_path)
+    cgt_calc.create_tax_parcels_from_transactions()
+    return cgt_calc
+
+
+def _emit(lines: list):
+    """Write a block of report lines to stdout in one call"""
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+def print_portfolio_summary(summary: dict, show_details: bool = False):
     """Print formatted portfolio summary"""
-    summary = tracker.get_portfolio_summary(EODHD_API_KEY, use_api, force_update)
-
-    print("=" * 60)
-    print("           ASX PAPER TRADING PORTFOLIO")
-    print("=" * 60)
-    print(f"Last Updated: {summary['last_updated']}")
-    print(f"API Calls Used Today: {summary['api_calls_used']}/20")
-    print()
-
-    print("PORTFOLIO OVERVIEW:")
-    print(f"  Total Cost Basis:     ${summary['total_cost']:>12,.2f}")
-    print(f"  Current Market Value: ${summary['total_market_value']:>12,.2f}")
-    print(f"  Cash Balance:         ${summary['cash_balance']:>12,.2f}")
-    print(f"  Total Portfolio:      ${summary['total_portfolio_value']:>12,.2f}")
-    print(f"  Total Fees Paid:      ${summary['total_fees']:>12,.2f}")
-    print(f"  Unrealized P&L:       ${summary['total_unrealized_pnl']:>12,.2f}")
+
+    lines = [
+        "=" * 60,
+        "           ASX PAPER TRADING PORTFOLIO",
+        "=" * 60,
+        f"Last Updated: {summary['last_updated']}",
+        f"API Calls Used Today: {summary['api_calls_used']}/20",
+        "",
+        "PORTFOLIO OVERVIEW:",
+        f"  Total Cost Basis:     ${summary['total_cost']:>12,.2f}",
+        f"  Current Market Value: ${summary['total_market_value']:>12,.2f}",
+        f"  Cash Balance:         ${summary['cash_balance']:>12,.2f}",
+        f"  Total Portfolio:      ${summary['total_portfolio_value']:>12,.2f}",
+        f"  Total Fees Paid:      ${summary['total_fees']:>12,.2f}",
+        f"  Unrealized P&L:       ${summary['total_unrealized_pnl']:>12,.2f}",
+    ]
 
     return_color = "📈" if summary["return_percentage"] >= 0 else "📉"
-    print(
+    lines.append(
         f"  Total Return:         {summary['return_percentage']:>11.2f}% {return_color}"
     )
-    print()
+    lines.append("")
 
     if show_details and summary["positions"]:
-        print("INDIVIDUAL POSITIONS:")
-        print(
+        lines.append("INDIVIDUAL POSITIONS:")
+        lines.append(
             f"{'Stock':<6} {'Qty':<6} {'Avg Cost':<10} {'Current':<10} {'Market Val':<12} {'P&L':<12} {'P&L %':<8}"
         )
-        print("-" * 70)
+        lines.append("-" * 70)
 
+        format_row = POSITION_ROW_FMT.format
         for pos in summary["positions"].values():
             pnl_pct = (
                 ((pos.current_price / pos.avg_cost - 1) * 100)
@@ -68,14 +93,27 @@ def print_portfolio_summary(
             )
             pnl_indicator = "🟢" if pos.unrealized_pnl >= 0 else "🔴"
 
-            print(
-                f"{pos.stock:<6} {pos.quantity:<6} ${pos.avg_cost:<9.4f} "
-                f"${pos.current_price:<9.4f} ${pos.market_value:<11.2f} "
-                f"${pos.unrealized_pnl:<11.2f} {pnl_pct:<7.2f}% {pnl_indicator}"
+            lines.append(
+                format_row(
+                    stock=pos.stock,
+                    qty=pos.quantity,
+                    avg=pos.avg_cost,
+                    cur=pos.current_price,
+                    mv=pos.market_value,
+                    pnl=pos.unrealized_pnl,
+                    pct=pnl_pct,
+                    ind=pnl_indicator,
+                )
             )
 
+    _emit(lines)
+
 
-def print_dividend_summary(dividend_tracker: DividendTracker, positions: dict):
+def print_dividend_summary(
+    dividend_tracker: DividendTracker,
+    positions: dict,
+    total_market_value: Optional[float] = None,
+):
     """Print dividend information"""
     print("\nDIVIDEND ANALYSIS:")
     print("-" * 60)
@@ -94,8 +132,11 @@ def print_dividend_summary(dividend_tracker: DividendTracker, positions: dict):
     if total_estimated_annual > 0:
         print(f"\nTotal Estimated Annual Dividends: ${total_estimated_annual:.2f}")
 
-        # Calculate portfolio yield
-        total_market_value = sum(pos.market_value for pos in positions.values())
+        # Calculate portfolio yield (reusing the summary's total when given)
+        if total_market_value is None:
+            total_market_value = portfolio_totals(
+                positions_to_array(positions)
+            ).total_market_value
         if total_market_value > 0:
             portfolio_yield = (total_estimated_annual / total_market_value) * 100
             print(f"Portfolio Dividend Yield: {portfolio_yield:.2f}%")
@@ -103,8 +144,7 @@ def print_dividend_summary(dividend_tracker: DividendTracker, positions: dict):
 
 def print_franking_summary(tracker: ASXPortfolioTracker, positions: dict):
     """Print franking credits analysis"""
-    print("\nFRANKING CREDITS ANALYSIS:")
-    print("-" * 60)
+    lines = ["\nFRANKING CREDITS ANALYSIS:", "-" * 60]
 
     # Check if franking is available
     try:
@@ -113,63 +153,72 @@ def print_franking_summary(tracker: ASXPortfolioTracker, positions: dict):
 
         franking_available = True
     except ImportError:
-        print("Franking calculator not available. Install required dependencies.")
+        lines.append(
+            "Franking calculator not available. Install required dependencies."
+        )
+        _emit(lines)
         return
 
     # Get franking summary
-    franking_summary = tracker.get_franking_summary()
+    franking_summary = tracker.get_franking_summary(positions=positions)
 
     if franking_summary:
-        print(
+        lines.append(
             f"Annual Franking Credits:  ${franking_summary.get('total_franking_credits', 0):>12,.2f}"
         )
-        print(
+        lines.append(
             f"Tax Benefit:             ${franking_summary.get('tax_benefit', 0):>12,.2f}"
         )
-        print(
+        lines.append(
             f"Franking Efficiency:     {franking_summary.get('franking_efficiency', 0):>11.1f}%"
         )
-        print(
+        lines.append(
             f"Effective Tax Rate:      {franking_summary.get('effective_tax_rate', 0):>11.1f}%"
         )
 
         # Show stock-by-stock franking analysis
         if "stock_details" in franking_summary:
-            print(f"\nSTOCK-BY-STOCK FRANKING ANALYSIS:")
-            print(
+            lines.append(f"\nSTOCK-BY-STOCK FRANKING ANALYSIS:")
+            lines.append(
                 f"{'Stock':<6} {'Franking':<8} {'Credits':<10} {'Effective':<10} {'Sector':<12}"
             )
-            print("-" * 60)
+            lines.append("-" * 60)
 
             for stock in franking_summary["stock_details"]:
-                print(
+                lines.append(
                     f"{stock['stock']:<6} {stock['franking_rate']:>6.0f}%  "
                     f"${stock['franking_credit']:>8.2f}  "
                     f"{stock['effective_yield']:>8.2f}%  "
                     f"{stock.get('sector', 'Unknown'):<12}"
                 )
     else:
-        print("No franking analysis available.")
+        lines.append("No franking analysis available.")
+
+    _emit(lines)
 
 
 def print_cgt_summary(
     tracker: ASXPortfolioTracker, positions: dict, tax_year: Optional[str] = None
 ):
     """Print CGT analysis"""
-    print("\nCAPITAL GAINS TAX ANALYSIS:")
-    print("-" * 60)
+    lines = ["\nCAPITAL GAINS TAX ANALYSIS:", "-" * 60]
 
-    if not CGT_AVAILABLE:
-        print(
+    cgt = _load_cgt()
+    if cgt is None:
+        lines.append(
             "CGT calculator not available. Please ensure cgt-calculator.py is in the directory."
         )
+        _emit(lines)
         return
 
-    try:
-        cgt_calc = CGTCalculator(tracker.db_path)
+    # Header goes out first so warnings printed while the calculator builds
+    # tax parcels appear under it
+    _emit(lines)
+    lines = []
 
+    try:
         # Initialize tax parcels if needed
-        cgt_calc.create_tax_parcels_from_transactions()
+        cgt_calc = _get_cgt_calculator(tracker.db_path)
 
         # Use current tax year if not specified
         if not tax_year:
@@ -190,67 +239,84 @@ def print_cgt_summary(
         unrealised = cgt_calc.get_unrealised_gains(current_prices)
 
         if unrealised:
-            print(
+            lines.append(
                 f"UNREALISED CAPITAL GAINS (as at {datetime.now().strftime('%Y-%m-%d')}):"
             )
-            print(
+            lines.append(
                 f"{'Stock':<6} {'Qty':<6} {'Cost Base':<12} {'Current Val':<12} {'Gain/Loss':<12} {'After Disc.':<12} {'Held':<8}"
             )
-            print("-" * 80)
+            lines.append("-" * 80)
 
+            total_cost_base = 0
+            total_current_value = 0
             total_unrealised = 0
             total_after_discount = 0
 
             for holding in unrealised:
+                total_cost_base += holding["cost_base"]
+                total_current_value += holding["current_value"]
                 total_unrealised += holding["unrealised_gain"]
                 total_after_discount += holding["after_discount"]
 
                 discount_indicator = "✓" if holding["discount_eligible"] else ""
 
-                print(
+                lines.append(
                     f"{holding['stock']:<6} {holding['quantity']:<6} "
                     f"${holding['cost_base']:<11.2f} ${holding['current_value']:<11.2f} "
                     f"${holding['unrealised_gain']:<11.2f} ${holding['after_discount']:<11.2f} "
                     f"{holding['holding_period_days']:>5}d {discount_indicator}"
                 )
 
-            print("-" * 80)
-            print(
-                f"{'TOTAL':<19} ${sum(h['cost_base'] for h in unrealised):<11.2f} "
-                f"${sum(h['current_value'] for h in unrealised):<11.2f} "
+            lines.append("-" * 80)
+            lines.append(
+                f"{'TOTAL':<19} ${total_cost_base:<11.2f} "
+                f"${total_current_value:<11.2f} "
                 f"${total_unrealised:<11.2f} ${total_after_discount:<11.2f}"
             )
 
-            print(f"\nPOTENTIAL CGT LIABILITY: ${max(0, total_after_discount):,.2f}")
+            lines.append(
+                f"\nPOTENTIAL CGT LIABILITY: ${max(0, total_after_discount):,.2f}"
+            )
 
             # Show savings from CGT discount
             discount_savings = total_unrealised - total_after_discount
             if discount_savings > 0:
-                print(f"CGT Discount Savings:    ${discount_savings:,.2f}")
+                lines.append(f"CGT Discount Savings:    ${discount_savings:,.2f}")
 
         # Show realised gains for current tax year
         try:
             summary = cgt_calc.calculate_annual_cgt(tax_year)
 
             if summary.total_capital_gains > 0 or summary.total_capital_losses > 0:
-                print(f"\nREALISED GAINS/LOSSES ({tax_year}):")
-                print(f"Total Capital Gains:     ${summary.total_capital_gains:,.2f}")
-                print(f"Total Capital Losses:    ${summary.total_capital_losses:,.2f}")
-                print(
+                lines.append(f"\nREALISED GAINS/LOSSES ({tax_year}):")
+                lines.append(
+                    f"Total Capital Gains:     ${summary.total_capital_gains:,.2f}"
+                )
+                lines.append(
+                    f"Total Capital Losses:    ${summary.total_capital_losses:,.2f}"
+                )
+                lines.append(
                     f"Discount Eligible Gains: ${summary.discount_eligible_gains:,.2f}"
                 )
-                print(f"After CGT Discount:      ${summary.discounted_gains:,.2f}")
-                print(
+                lines.append(
+                    f"After CGT Discount:      ${summary.discounted_gains:,.2f}"
+                )
+                lines.append(
                     f"Carried Forward Losses:  ${summary.carried_forward_losses:,.2f}"
                 )
-                print(f"\nNET CAPITAL GAIN:       ${summary.net_capital_gain:,.2f}")
+                lines.append(
+                    f"\nNET CAPITAL GAIN:       ${summary.net_capital_gain:,.2f}"
+                )
         except:
             # No realised events yet
             pass
 
     except Exception as e:
-        print(f"CGT analysis error: {e}")
-        print("Run with --update-cgt to initialize CGT tracking")
+        lines.append(f"CGT analysis error: {e}")
+        lines.append("Run with --update-cgt to initialize CGT tracking")
+
+    if lines:
+        _emit(lines)
 
 
 def add_transaction(tracker: ASXPortfolioTracker):
@@ -278,11 +344,8 @@ def add_transaction(tracker: ASXPortfolioTracker):
         confirm = input("\nConfirm transaction? (y/N): ").lower()
 
         if confirm == "y":
-            # Create CSV format for import
             date = datetime.now().strftime("%Y-%m-%d")
-            csv_data = f"Date,Stock,Action,Quantity,Price,Total,Status\n{date},{stock},{action},{quantity},{price},{total},executed"
-
-            tracker.import_transactions_from_csv(csv_data)
+            tracker.add_transaction(date, stock, action, quantity, price, total)
             print("✅ Transaction added successfully!")
         else:
             print("Transaction cancelled.")
@@ -303,17 +366,17 @@ def export_data(tracker: ASXPortfolioTracker):
         filename = tracker.export_portfolio_csv()
         print(f"✅ Portfolio exported to {filename}")
     elif choice == "2":
-        # Export transaction history
+        # Export transaction history, streaming rows straight from SQLite
         import sqlite3
 
         conn = sqlite3.connect(tracker.db_path)
-
-        import pandas as pd
-
-        df = pd.read_sql_query("SELECT * FROM transactions ORDER BY date DESC", conn)
+        cursor = conn.execute("SELECT * FROM transactions ORDER BY date DESC")
 
         filename = f"transactions_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-        df.to_csv(filename, index=False)
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow([description[0] for description in cursor.description])
+            writer.writerows(cursor)
 
         conn.close()
         print(f"✅ Transaction history exported to {filename}")
@@ -369,11 +432,8 @@ def main():
     tracker = ASXPortfolioTracker()
     dividend_tracker = DividendTracker()
 
-    # Check if we have any transactions
-    summary = tracker.get_portfolio_summary(
-        args.api_key, False
-    )  # Don't use API for initial check
-    if not summary["positions"]:
+    # Check if we have any transactions (positions only, no pricing needed)
+    if not tracker.get_positions():
         print("No portfolio data found. Import your initial transactions:")
 
         # Load sample data for demo
@@ -395,9 +455,6 @@ def main():
         tracker.import_transactions_from_csv(csv_data)
         populate_sample_dividends(dividend_tracker)
         print("✅ Sample portfolio data loaded!")
-        summary = tracker.get_portfolio_summary(
-            args.api_key, False
-        )  # Don't use API by default
 
     # Handle command line arguments
     if args.add:
@@ -422,11 +479,34 @@ def main():
         major_stocks = ["CBA", "BHP", "WOW", "CSL", "XRO"]
         positions = tracker.get_positions()
 
+        today = asx_today()
+        targets = []
         for stock in positions.keys():
             if stock in major_stocks:
-                price = tracker.get_current_price_eodhd(stock, args.api_key)
+                # A fresh stored API price doubles as an on-disk cache (short TTL
+                # while the market is open, the rest of the day after the close)
+                price = tracker.get_stored_price_today(stock, today)
                 if price:
-                    print(f"✅ {stock}: ${price:.4f}")
+                    print(f"📋 {stock}: ${price:.4f} (cached from today)")
+                else:
+                    targets.append(stock)
+
+        # Remaining lookups are network-bound, so fetch them concurrently
+        if targets:
+            with tracker.deferred_price_writes(), ThreadPoolExecutor(
+                max_workers=min(PRICE_FETCH_WORKERS, len(targets))
+            ) as executor:
+                prices = executor.map(
+                    tracker.in_price_batch(
+                        lambda stock: tracker.get_current_price_eodhd(
+                            stock, args.api_key
+                        )
+                    ),
+                    targets,
+                )
+                for stock, price in zip(targets, prices):
+                    if price:
+                        print(f"✅ {stock}: ${price:.4f}")
 
         summary = tracker.get_portfolio_summary(
             args.api_key, False
@@ -436,13 +516,13 @@ def main():
         # No update requested, just get summary without API
         summary = tracker.get_portfolio_summary(args.api_key, False)
 
-    # Display portfolio summary
-    print_portfolio_summary(
-        tracker, args.details, False, False
-    )  # Never use API for display - already fetched
+    # Display portfolio summary (reuses the prices fetched above)
+    print_portfolio_summary(summary, args.details)
 
     if args.dividends:
-        print_dividend_summary(dividend_tracker, summary["positions"])
+        print_dividend_summary(
+            dividend_tracker, summary["positions"], summary["total_market_value"]
+        )
 
     if args.franking:
         print_franking_summary(tracker, summary["positions"])
@@ -451,54 +531,59 @@ def main():
         print_cgt_summary(tracker, summary["positions"])
 
     if args.cgt_report:
-        if not CGT_AVAILABLE:
+        cgt = _load_cgt()
+        if cgt is None:
             print(
                 "\n❌ CGT calculator not available. Please ensure cgt-calculator.py is in the directory."
             )
         else:
             try:
-                cgt_calc = CGTCalculator(tracker.db_path)
-                cgt_calc.create_tax_parcels_from_transactions()
-                generate_cgt_report(cgt_calc, args.cgt_report)
+                cgt_calc = _get_cgt_calculator(tracker.db_path)
+                cgt.generate_cgt_report(cgt_calc, args.cgt_report)
             except Exception as e:
                 print(f"Error generating CGT report: {e}")
 
     if args.update_cgt:
-        if not CGT_AVAILABLE:
+        cgt = _load_cgt()
+        if cgt is None:
             print(
                 "\n❌ CGT calculator not available. Please ensure cgt-calculator.py is in the directory."
             )
         else:
             print("\nInitializing CGT tracking...")
             try:
-                cgt_calc = CGTCalculator(tracker.db_path)
-                cgt_calc.create_tax_parcels_from_transactions()
+                _get_cgt_calculator(tracker.db_path)
                 print("✅ CGT tracking initialized from transaction history")
             except Exception as e:
                 print(f"❌ Error initializing CGT tracking: {e}")
 
     if args.update_franking:
         print("\nUpdating franking data from API...")
+        # The tracker's franking database already holds stored API rates
+        franking_db = tracker.franking_db
+        stocks = list(summary["positions"].keys())
         try:
-            from franking_calculator import StaticFrankingDatabase
-
-            franking_db = StaticFrankingDatabase()
-
-            # Get stocks from current portfolio
-            stocks = list(summary["positions"].keys())
-            if stocks:
-                results = franking_db.bulk_update_franking_from_api(
-                    stocks, args.api_key
-                )
-                if results:
-                    print(f"✅ Updated franking data for {len(results)} stocks")
-                else:
-                    print("❌ No franking updates available")
+            if franking_db is None:
+                print("❌ Franking calculator not available")
+            elif stocks:
+                # Skip stocks updated from the API within FRANKING_CACHE_DAYS
+                fresh = set(tracker.get_fresh_franking_stocks(stocks))
+                stale = [stock for stock in stocks if stock not in fresh]
+                if fresh:
+                    print(f"📋 Franking cache fresh for {len(fresh)} stocks")
+
+                if stale:
+                    results = franking_db.bulk_update_franking_from_api(
+                        stale, args.api_key
+                    )
+                    if results:
+                        tracker.store_franking_updates(results)
+                        print(f"✅ Updated franking data for {len(results)} stocks")
+                    else:
+                        print("❌ No franking updates available")
             else:
                 print("❌ No stocks in portfolio to update")
 
-        except ImportError:
-            print("❌ Franking calculator not available")
         except Exception as e:
             print(f"❌ Error updating franking data: {e}")
 
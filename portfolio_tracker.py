@@ -8,24 +8,59 @@ Enhanced with franking credit analysis for Australian investors
 import csv
 import json
 import sqlite3
+import sys
+import threading
 import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import asdict, dataclass
-from datetime import datetime, timedelta
+from datetime import date, datetime, time as dt_time, timedelta
+from functools import lru_cache, wraps
 from typing import Dict, List, Optional, Tuple
 
-import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 
-# Import franking calculator
+# ASX trading hours are Sydney time; fall back to local time without tz data
 try:
-    from franking_calculator import (FrankingTaxCalculator,
-                                     StaticFrankingDatabase,
-                                     get_yahoo_dividend_data)
+    from zoneinfo import ZoneInfo
 
-    FRANKING_AVAILABLE = True
+    ASX_TZ = ZoneInfo("Australia/Sydney")
+except Exception:
+    ASX_TZ = None
+
+# orjson parses API responses several times faster when it is installed
+try:
+    import orjson
 except ImportError:
-    print("Warning: Franking calculator not available. Some features may be limited.")
-    FRANKING_AVAILABLE = False
+    orjson = None
+
+
+def _serialized(method):
+    """Run a tracker method while holding the tracker's database lock"""
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._db_lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+# Franking support is only needed by the franking paths, so load it lazily
+@lru_cache(maxsize=None)
+def _load_franking():
+    """Import the franking module on first use; None if it isn't available"""
+    try:
+        import franking_calculator
+    except ImportError:
+        print(
+            "Warning: Franking calculator not available. Some features may be limited."
+        )
+        return None
+    return franking_calculator
 
 
 @dataclass
@@ -52,33 +87,264 @@ class Position:
     total_dividends: float = 0.0
 
 
+# Concurrent EODHD requests when refreshing prices
+PRICE_FETCH_WORKERS = 8
+
+# Seconds an API price is reused before the network is asked again
+PRICE_CACHE_TTL = 900
+
+# EODHD calls allowed per day on the free plan
+EODHD_DAILY_LIMIT = 20
+
+# ASX continuous trading session
+ASX_OPEN = dt_time(10, 0)
+ASX_CLOSE = dt_time(16, 0)
+
+# Franking rates change at most each reporting season, so API results stay fresh
+FRANKING_CACHE_DAYS = 30
+
+# Structure-of-arrays view of positions, for vectorized totals
+POSITION_DTYPE = np.dtype(
+    [
+        ("stock", "U10"),
+        ("quantity", "i8"),
+        ("avg_cost", "f8"),
+        ("current_price", "f8"),
+        ("market_value", "f8"),
+        ("unrealized_pnl", "f8"),
+    ]
+)
+
+
+def positions_to_array(positions: Dict[str, Position]) -> np.ndarray:
+    """Pack positions into a POSITION_DTYPE structured array"""
+    return np.array(
+        [
+            (
+                pos.stock,
+                pos.quantity,
+                pos.avg_cost,
+                pos.current_price,
+                pos.market_value,
+                pos.unrealized_pnl,
+            )
+            for pos in positions.values()
+        ],
+        dtype=POSITION_DTYPE,
+    )
+
+
+@dataclass
+class PortfolioTotals:
+    """Aggregate cost, market value and unrealized P&L of a set of positions"""
+
+    __slots__ = ("total_cost", "total_market_value", "total_unrealized_pnl")
+    total_cost: float
+    total_market_value: float
+    total_unrealized_pnl: float
+
+
+def portfolio_totals(arr: np.ndarray) -> PortfolioTotals:
+    """Totals for a POSITION_DTYPE array, computed with one reduction each"""
+    total_cost = float(np.dot(arr["avg_cost"], arr["quantity"]))
+    total_market_value = float(arr["market_value"].sum())
+    return PortfolioTotals(
+        total_cost, total_market_value, total_market_value - total_cost
+    )
+
+
+def _pnl_percent(current_price: np.ndarray, avg_cost: np.ndarray) -> np.ndarray:
+    """Unrealized P&L as a percentage of average cost (0 where cost is unknown)"""
+    # Divide into a fresh buffer and finish in place: one temporary in total.
+    # The masked divide already has no per-row Python branch, and it measured
+    # no slower than select-then-divide variants, which need extra temporaries.
+    # Rows without a cost keep the 1.0 fill and come out as exactly +0.0.
+    pct = np.divide(
+        current_price, avg_cost, out=np.ones_like(avg_cost), where=avg_cost > 0
+    )
+    pct -= 1
+    pct *= 100
+    return pct
+
+
+# Statements run per stock or per row. As shared constants they always hit
+# the connection's prepared-statement cache instead of being re-parsed.
+SQL_INSERT_TRANSACTION = """
+    INSERT INTO transactions
+    (date, stock, action, quantity, price, total, fees, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_IMPORT_TRANSACTION = """
+    INSERT OR REPLACE INTO transactions
+    (date, stock, action, quantity, price, total, fees, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_INSERT_PRICE = """
+    INSERT OR REPLACE INTO price_history (stock, date, price, source, fetched_at)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_LATEST_PRICE = """
+    SELECT price FROM price_history
+    WHERE stock = ?
+    ORDER BY date DESC
+    LIMIT 1
+"""
+SQL_STORED_PRICE_TODAY = """
+    SELECT price FROM price_history
+    WHERE stock = ? AND date = ? AND source LIKE 'eodhd%'
+    AND fetched_at >= COALESCE(?, 0)
+    ORDER BY id DESC
+    LIMIT 1
+"""
+
+# Placeholders EODHD uses when it has no price for a symbol
+MISSING_PRICE_VALUES = ("NA", "", "null")
+
+
+def _parse_price(value) -> Optional[float]:
+    """Parse an EODHD close value; None for missing or malformed prices"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if value in MISSING_PRICE_VALUES:
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def asx_today() -> str:
+    """Today's date (YYYY-MM-DD) on the ASX calendar, as price_history stores it"""
+    return datetime.now(ASX_TZ).date().isoformat()
+
+
+def _stored_price_cutoff(now: datetime) -> Optional[float]:
+    """Earliest fetch time (epoch seconds) at which today's stored price is reusable"""
+    if now.weekday() >= 5 or now.time() < ASX_OPEN:
+        # No trading since any price stored today was fetched
+        return None
+    if now.time() < ASX_CLOSE:
+        # Prices move during the session, so only reuse recent fetches
+        return now.timestamp() - PRICE_CACHE_TTL
+    # After the close a price fetched post-close holds for the rest of the day
+    return datetime.combine(now.date(), ASX_CLOSE, now.tzinfo).timestamp()
+
+
+def _response_json(response: requests.Response):
+    """Decode a JSON response body, with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(response.content)
+    return response.json()
+
+
 class ASXPortfolioTracker:
     def __init__(self, db_path: str = "portfolio.db", starting_cash: float = 25000.0):
         self.db_path = db_path
         self.starting_cash = starting_cash
+
+        # One connection for the tracker's lifetime; opening a new one per
+        # query costs more than most of the queries themselves
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        # The tracker may be shared between threads (e.g. Streamlit sessions).
+        # Commit and rollback act on the whole connection, so every use of it
+        # holds this lock and one thread's transaction can't take in another's
+        self._db_lock = threading.RLock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA temp_store=MEMORY")
+        # Memory-map reads and keep up to 64 MiB of pages cached in-process
+        self._conn.execute("PRAGMA mmap_size=268435456")
+        self._conn.execute("PRAGMA cache_size=-65536")
+
         self.init_database()
-        self.api_calls_today = 0
-        self.last_api_reset = datetime.now().date()
+        self.last_api_reset = date.today()
+        self.api_calls_today = self._load_api_calls(self.last_api_reset)
+        self._api_lock = threading.Lock()
+        # API prices and the monotonic time each was fetched, keyed by ticker
+        self._cached_prices: Dict[str, float] = {}
+        self._price_fetched_at: Dict[str, float] = {}
+        # Deferred price rows live per thread so concurrent callers each
+        # commit only their own batch (see deferred_price_writes)
+        self._local = threading.local()
+        self._user_flags_cache: Optional[Tuple] = None
+
+        # Keep-alive session sized for concurrent price fetches
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=PRICE_FETCH_WORKERS, pool_maxsize=PRICE_FETCH_WORKERS
+        )
+        self.session.mount("https://", adapter)
 
         # ASX brokerage fee structure (typical)
         self.min_brokerage = 19.95
         self.brokerage_rate = 0.001  # 0.1%
 
-        # Initialize franking calculator if available
-        if FRANKING_AVAILABLE:
-            self.franking_calculator: Optional[
-                FrankingTaxCalculator
-            ] = FrankingTaxCalculator(self.db_path)
-            self.franking_db: Optional[
-                StaticFrankingDatabase
-            ] = StaticFrankingDatabase()
-        else:
-            self.franking_calculator = None
-            self.franking_db = None
+        # Franking calculator is created on first use, if available
+        self._franking_calculator = None
+        self._franking_db = None
+        self._franking_info: Dict[str, Dict] = {}
+
+    @contextmanager
+    def locked_connection(self):
+        """Shared database connection, held exclusively for the with block"""
+        with self._db_lock:
+            yield self._conn
+
+    @property
+    def franking_calculator(self):
+        """Franking tax calculator, or None if franking support isn't available"""
+        if self._franking_calculator is None:
+            franking = _load_franking()
+            if franking is not None:
+                self._franking_calculator = franking.FrankingTaxCalculator(self.db_path)
+                self._apply_stored_franking(self._franking_calculator.franking_db)
+        return self._franking_calculator
+
+    @property
+    def franking_db(self):
+        """Static franking database, or None if franking support isn't available"""
+        if self._franking_db is None:
+            franking = _load_franking()
+            if franking is not None:
+                self._franking_db = franking.StaticFrankingDatabase()
+                self._apply_stored_franking(self._franking_db)
+        return self._franking_db
+
+    @_serialized
+    def _apply_stored_franking(self, franking_db):
+        """Overlay franking rates stored from earlier API updates onto franking_db"""
+        cursor = self._conn.cursor()
+        cursor.execute(
+            """
+            SELECT stock, typical_franking_rate, sector FROM franking_static_data
+            WHERE reliability = 'api_updated'
+        """
+        )
+        for stock, rate, sector in cursor.fetchall():
+            franking_db.franking_data[stock] = {
+                "franking_rate": rate,
+                "sector": sector,
+                "reliability": "api_updated",
+            }
 
+    def close(self):
+        """Close the shared database connection"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    @_serialized
     def init_database(self):
         """Initialize SQLite database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         # Transactions table
@@ -107,11 +373,18 @@ class ASXPortfolioTracker:
                 date TEXT NOT NULL,
                 price REAL NOT NULL,
                 source TEXT NOT NULL,
+                fetched_at REAL,
                 UNIQUE(stock, date)
             )
         """
         )
 
+        # Older databases predate fetched_at; their rows are never treated as
+        # fresh by get_stored_price_today
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(price_history)")}
+        if "fetched_at" not in columns:
+            cursor.execute("ALTER TABLE price_history ADD COLUMN fetched_at REAL")
+
         # Enhanced dividends table with franking information
         cursor.execute(
             """
@@ -170,35 +443,72 @@ class ASXPortfolioTracker:
         """
         )
 
+        # EODHD calls per day, so the daily quota survives between runs
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS api_usage (
+                date TEXT PRIMARY KEY,
+                calls INTEGER NOT NULL DEFAULT 0
+            )
+        """
+        )
+
+        # Date-ordered scans (either direction) and per-stock transaction lookups.
+        # Ascending keeps same-day rows in insertion order for ORDER BY date ASC.
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions(date)"
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_stock_date "
+            "ON transactions(stock, date)"
+        )
+        # Positions and cash balance read executed rows in date order
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_transactions_status_date "
+            "ON transactions(status, date)"
+        )
+
         conn.commit()
-        conn.close()
 
     def calculate_brokerage(self, total_value: float) -> float:
         """Calculate brokerage fees based on transaction value"""
         calculated_fee = total_value * self.brokerage_rate
         return max(calculated_fee, self.min_brokerage)
 
+    @_serialized
+    def add_transaction(
+        self,
+        date: str,
+        stock: str,
+        action: str,
+        quantity: int,
+        price: float,
+        total: float,
+        status: str = "executed",
+    ):
+        """Record a single transaction directly"""
+        fees = self.calculate_brokerage(total)
+
+        conn = self._conn
+        with conn:
+            conn.execute(
+                SQL_INSERT_TRANSACTION,
+                (date, stock, action.lower(), quantity, price, total, fees, status),
+            )
+
+    @_serialized
     def import_transactions_from_csv(self, csv_data: str):
         """Import transactions from CSV string"""
         lines = csv_data.strip().split("\n")
         reader = csv.DictReader(lines)
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
+        rows = []
         for row in reader:
             if row["Date"] == "Date":  # Skip header if present again
                 continue
 
             total_value = float(row["Total"])
-            fees = self.calculate_brokerage(total_value)
-
-            cursor.execute(
-                """
-                INSERT OR REPLACE INTO transactions 
-                (date, stock, action, quantity, price, total, fees, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """,
+            rows.append(
                 (
                     row["Date"],
                     row["Stock"],
@@ -206,67 +516,68 @@ class ASXPortfolioTracker:
                     int(row["Quantity"]),
                     float(row["Price"]),
                     total_value,
-                    fees,
+                    self.calculate_brokerage(total_value),
                     row["Status"],
-                ),
+                )
             )
 
-        conn.commit()
-        conn.close()
-        print(f"Imported {len(list(csv.DictReader(lines)))} transactions")
+        # Insert every row with one executemany inside a single transaction
+        conn = self._conn
+        with conn:
+            conn.executemany(SQL_IMPORT_TRANSACTION, rows)
+        print(f"Imported {len(rows)} transactions")
 
     def get_current_price_eodhd(
         self, stock_symbol: str, api_key: str = "demo", force: bool = False
     ) -> Optional[float]:
         """Get current price from EODHD API"""
-        if not force and self.api_calls_today >= 20:
+        if not force:
+            fetched_at = self._price_fetched_at.get(stock_symbol)
+            if fetched_at is not None and (
+                time.monotonic() - fetched_at < PRICE_CACHE_TTL
+            ):
+                return self._cached_prices[stock_symbol]
+
+        if not self._reserve_api_call(force):
             print(
-                f"⚠️  API limit reached for today ({self.api_calls_today}/20). Using stored prices."
+                f"⚠️  API limit reached for today ({self.api_calls_today}/{EODHD_DAILY_LIMIT}). Using stored prices."
             )
             return None
 
-        # Reset daily counter if new day
-        if datetime.now().date() > self.last_api_reset:
-            self.api_calls_today = 0
-            self.last_api_reset = datetime.now().date()
-
         # Try real-time API first
         try:
             url = f"https://eodhd.com/api/real-time/{stock_symbol}.AU"
             params = {"api_token": api_key, "fmt": "json"}
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-            self.api_calls_today += 1
+            data = _response_json(response)
 
             if "close" in data:
-                close_price = data["close"]
-                # Handle 'NA' values from API
-                if close_price == "NA" or close_price is None:
+                price = _parse_price(data["close"])
+                if price is None:
                     print(f"No real-time data for {stock_symbol}, trying EOD data...")
-                    return self.get_eod_price_eodhd(stock_symbol, api_key)
+                    return self.get_eod_price_eodhd(stock_symbol, api_key, force)
 
-                try:
-                    price = float(close_price)
-                    self.store_price_history(stock_symbol, price, "eodhd_realtime")
-                    print(f"✅ {stock_symbol}: ${price:.4f} (real-time)")
-                    return price
-                except (ValueError, TypeError):
-                    print(f"Invalid price format for {stock_symbol}: {close_price}")
-                    return self.get_eod_price_eodhd(stock_symbol, api_key)
+                self._record_api_price(stock_symbol, price, "eodhd_realtime")
+                print(f"✅ {stock_symbol}: ${price:.4f} (real-time)")
+                return price
 
         except Exception as e:
             print(f"Real-time API error for {stock_symbol}: {e}")
-            return self.get_eod_price_eodhd(stock_symbol, api_key)
+            return self.get_eod_price_eodhd(stock_symbol, api_key, force)
 
         return None
 
     def get_eod_price_eodhd(
-        self, stock_symbol: str, api_key: str = "demo"
+        self, stock_symbol: str, api_key: str = "demo", force: bool = False
     ) -> Optional[float]:
         """Get end-of-day price from EODHD API as fallback"""
+        if not self._reserve_api_call(force):
+            print(f"⚠️  API limit reached, no EOD lookup for {stock_symbol}")
+            return None
+
         try:
             # Try end-of-day data for the last trading day
             yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
@@ -278,22 +589,17 @@ class ASXPortfolioTracker:
                 "to": yesterday,
             }
 
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
 
-            data = response.json()
-            self.api_calls_today += 1
+            data = _response_json(response)
 
-            if data and len(data) > 0 and "close" in data[0]:
-                close_price = data[0]["close"]
-                if close_price != "NA" and close_price is not None:
-                    try:
-                        price = float(close_price)
-                        self.store_price_history(stock_symbol, price, "eodhd_eod")
-                        print(f"✅ {stock_symbol}: ${price:.4f} (EOD)")
-                        return price
-                    except (ValueError, TypeError):
-                        pass
+            if data and "close" in data[0]:
+                price = _parse_price(data[0]["close"])
+                if price is not None:
+                    self._record_api_price(stock_symbol, price, "eodhd_eod")
+                    print(f"✅ {stock_symbol}: ${price:.4f} (EOD)")
+                    return price
 
             print(f"❌ No valid EOD data for {stock_symbol}")
 
@@ -302,103 +608,176 @@ class ASXPortfolioTracker:
 
         return None
 
-    def get_fallback_price(self, stock_symbol: str) -> Optional[float]:
-        """Get price from stored history as fallback"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @_serialized
+    def _load_api_calls(self, day) -> int:
+        """Get the number of EODHD calls recorded for a day"""
+        cursor = self._conn.cursor()
+        cursor.execute("SELECT calls FROM api_usage WHERE date = ?", (str(day),))
+        result = cursor.fetchone()
 
-        cursor.execute(
-            """
-            SELECT price FROM price_history 
-            WHERE stock = ? 
-            ORDER BY date DESC 
-            LIMIT 1
-        """,
-            (stock_symbol,),
-        )
+        return result[0] if result else 0
+
+    def _reserve_api_call(self, force: bool = False) -> bool:
+        """Claim one EODHD call from today's quota before making the request"""
+        # Check and increment are a single statement, so concurrent fetches
+        # (or other processes) can't overshoot the limit. Forced refreshes
+        # always get their call.
+        limit = None if force else EODHD_DAILY_LIMIT
+        with self._api_lock, self._db_lock:
+            # Reset daily counter if new day
+            current_day = date.today()
+            if current_day > self.last_api_reset:
+                self.last_api_reset = current_day
+            today = str(self.last_api_reset)
+
+            conn = self._conn
+            with conn:
+                cursor = conn.execute(
+                    """
+                    INSERT INTO api_usage (date, calls) VALUES (?, 1)
+                    ON CONFLICT(date) DO UPDATE SET calls = calls + 1
+                    WHERE ? IS NULL OR calls < ?
+                """,
+                    (today, limit, limit),
+                )
+            # Re-read so calls made by other processes count too
+            self.api_calls_today = self._load_api_calls(today)
 
-        result = cursor.fetchone()
-        conn.close()
+        return cursor.rowcount > 0
 
-        if result:
-            return result[0]
+    def _record_api_price(self, stock_symbol: str, price: float, source: str):
+        """Store an API price in history and the in-process cache"""
+        self.store_price_history(stock_symbol, price, source)
+        self._cached_prices[stock_symbol] = price
+        self._price_fetched_at[stock_symbol] = time.monotonic()
+
+    def get_fallback_price(self, stock_symbol: str) -> Optional[float]:
+        """Get price from stored history as fallback"""
+        return self.get_fallback_prices([stock_symbol]).get(stock_symbol)
+
+    @_serialized
+    def get_fallback_prices(self, stocks: List[str]) -> Dict[str, float]:
+        """Get fallback prices for many stocks (stored history, then samples)"""
+        prices = {}
+        unstored = []
+        for stock in stocks:
+            result = self._conn.execute(SQL_LATEST_PRICE, (stock,)).fetchone()
+            if result:
+                prices[stock] = result[0]
+            else:
+                unstored.append(stock)
 
-        # If no stored price, try sample price for demo
+        if not unstored:
+            return prices
+
+        # If no stored price, try sample prices for demo
         try:
-            from sample_prices import get_sample_price
+            from sample_prices import get_sample_prices
+        except ImportError:
+            return prices
 
-            sample_price = get_sample_price(stock_symbol)
+        for stock, sample_price in zip(unstored, get_sample_prices(unstored).tolist()):
             if sample_price > 0:
-                self.store_price_history(stock_symbol, sample_price, "sample")
-                return sample_price
-        except ImportError:
-            pass
+                self.store_price_history(stock, sample_price, "sample")
+                prices[stock] = sample_price
 
-        return None
+        return prices
 
-    def store_price_history(self, stock: str, price: float, source: str):
-        """Store price in history table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def store_price_history(
+        self, stock: str, price: float, source: str, today: Optional[str] = None
+    ):
+        """Store price in history table (today as YYYY-MM-DD, default ASX today)"""
+        row = (stock, today or asx_today(), price, source, time.time())
 
-        today = datetime.now().strftime("%Y-%m-%d")
+        pending = getattr(self._local, "pending_prices", None)
+        if pending is not None:
+            pending.append(row)
+        else:
+            self._write_price_rows([row])
+
+    @_serialized
+    def _write_price_rows(self, rows: List[Tuple]):
+        """Insert price history rows in one transaction"""
+        if not rows:
+            return
+
+        conn = self._conn
+        with conn:
+            conn.executemany(SQL_INSERT_PRICE, rows)
+
+    @contextmanager
+    def deferred_price_writes(self):
+        """Buffer this thread's store_price_history calls and commit them on exit"""
+        if getattr(self._local, "pending_prices", None) is not None:
+            # Already inside an outer block, which will do the flush
+            yield
+            return
+
+        self._local.pending_prices = []
+        try:
+            yield
+        finally:
+            pending, self._local.pending_prices = self._local.pending_prices, None
+            self._write_price_rows(pending)
 
-        cursor.execute(
-            """
-            INSERT OR REPLACE INTO price_history (stock, date, price, source)
-            VALUES (?, ?, ?, ?)
-        """,
-            (stock, today, price, source),
-        )
+    def in_price_batch(self, func):
+        """Wrap func so pool threads running it add to the caller's deferred batch"""
+        pending = getattr(self._local, "pending_prices", None)
 
-        conn.commit()
-        conn.close()
+        def run(*args, **kwargs):
+            self._local.pending_prices = pending
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.pending_prices = None
+
+        return run
 
+    @_serialized
     def get_positions(self) -> Dict[str, Position]:
         """Calculate current positions from transaction history"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         cursor.execute(
             """
-            SELECT stock, action, quantity, price, total, fees
+            SELECT stock, action, quantity, total, fees
             FROM transactions 
             WHERE status = 'executed'
             ORDER BY date ASC
         """
         )
 
-        transactions = cursor.fetchall()
-        conn.close()
-
-        positions = {}
+        # Running [quantity, total_cost, total_fees] per stock. Sells scale the
+        # cost basis, so this has to replay transactions in date order.
+        holdings: Dict[str, List] = {}
 
-        for stock, action, quantity, price, total, fees in transactions:
-            if stock not in positions:
-                positions[stock] = {"quantity": 0, "total_cost": 0.0, "total_fees": 0.0}
+        for stock, action, quantity, total, fees in cursor.fetchall():
+            state = holdings.get(stock)
+            if state is None:
+                # Interned so later dict lookups by ticker compare by identity
+                state = holdings[sys.intern(stock)] = [0, 0.0, 0.0]
 
             if action == "buy":
-                positions[stock]["quantity"] += quantity
-                positions[stock]["total_cost"] += total
-                positions[stock]["total_fees"] += fees
-            elif action == "sell":
+                state[0] += quantity
+                state[1] += total
+                state[2] += fees
+            elif action == "sell" and state[0] > 0:
                 # Handle partial sells
-                if positions[stock]["quantity"] > 0:
-                    sell_ratio = quantity / positions[stock]["quantity"]
-                    positions[stock]["quantity"] -= quantity
-                    positions[stock]["total_cost"] *= 1 - sell_ratio
-                    positions[stock]["total_fees"] += fees
+                state[1] *= 1 - quantity / state[0]
+                state[0] -= quantity
+                state[2] += fees
 
         # Convert to Position objects
-        result = {}
-        for stock, data in positions.items():
-            if data["quantity"] > 0:
-                avg_cost = (data["total_cost"] + data["total_fees"]) / data["quantity"]
-                result[stock] = Position(
-                    stock=stock, quantity=int(data["quantity"]), avg_cost=avg_cost
-                )
-
-        return result
+        return {
+            stock: Position(
+                stock=stock,
+                quantity=int(quantity),
+                avg_cost=(total_cost + total_fees) / quantity,
+            )
+            for stock, (quantity, total_cost, total_fees) in holdings.items()
+            if quantity > 0
+        }
 
     def update_current_prices(
         self, api_key: str = "demo", use_api: bool = False, force: bool = False
@@ -406,112 +785,142 @@ class ASXPortfolioTracker:
         """Update current prices for all positions"""
         positions = self.get_positions()
 
-        for stock in positions.keys():
-            price: Optional[float]
-            if use_api:
-                # Check if we already have fresh data from today first (unless forced)
-                stored_price = self.get_stored_price_today(stock) if not force else None
+        prices: Dict[str, Optional[float]] = {}
+        if use_api:
+            # Check if we already have fresh data from today first (unless forced)
+            today = asx_today()
+            targets = []
+            for stock in positions:
+                stored_price = (
+                    self.get_stored_price_today(stock, today) if not force else None
+                )
                 if stored_price:
-                    price = stored_price
-                    print(f"📋 {stock}: ${price:.4f} (cached from today)")
+                    prices[stock] = stored_price
+                    print(f"📋 {stock}: ${stored_price:.4f} (cached from today)")
                 else:
-                    price = self.get_current_price_eodhd(stock, api_key, force)
-                    if price is None:
-                        price = self.get_fallback_price(stock)
-                    # Small delay to respect API limits
-                    time.sleep(0.1)
-            else:
-                # Use fallback/sample prices by default
-                price = self.get_fallback_price(stock)
-
+                    targets.append(stock)
+
+            # Remaining lookups are network-bound, so fetch them concurrently
+            # and commit the fetched prices in one transaction
+            if targets:
+                workers = min(PRICE_FETCH_WORKERS, len(targets))
+                with self.deferred_price_writes(), ThreadPoolExecutor(
+                    max_workers=workers
+                ) as executor:
+                    fetched = executor.map(
+                        self.in_price_batch(
+                            lambda stock: self.get_current_price_eodhd(
+                                stock, api_key, force
+                            )
+                        ),
+                        targets,
+                    )
+                    prices.update(zip(targets, fetched))
+
+        # Sample prices stored by the fallback are committed together as well
+        with self.deferred_price_writes():
+            # Use fallback/sample prices by default
+            missing = [stock for stock in positions if prices.get(stock) is None]
+            prices.update(self.get_fallback_prices(missing))
+            price_buf = array("d", (prices.get(stock) or 0.0 for stock in positions))
+
+        # Value every position from one price vector; positions without a
+        # price keep their zero defaults
+        price_vec = np.frombuffer(price_buf, dtype=np.float64)
+        quantity = np.fromiter(
+            (p.quantity for p in positions.values()), dtype=np.float64
+        )
+        avg_cost = np.fromiter(
+            (p.avg_cost for p in positions.values()), dtype=np.float64
+        )
+        market_value = price_vec * quantity
+        # Cost basis then P&L are written into the avg_cost buffer
+        unrealized_pnl = np.multiply(avg_cost, quantity, out=avg_cost)
+        np.subtract(market_value, unrealized_pnl, out=unrealized_pnl)
+
+        for position, price, value, pnl in zip(
+            positions.values(),
+            price_vec.tolist(),
+            market_value.tolist(),
+            unrealized_pnl.tolist(),
+        ):
             if price:
-                positions[stock].current_price = price
-                positions[stock].market_value = price * positions[stock].quantity
-                cost_basis = positions[stock].avg_cost * positions[stock].quantity
-                positions[stock].unrealized_pnl = (
-                    positions[stock].market_value - cost_basis
-                )
+                position.current_price = price
+                position.market_value = value
+                position.unrealized_pnl = pnl
 
         return positions
 
-    def get_stored_price_today(self, stock_symbol: str) -> Optional[float]:
-        """Get price stored today to avoid duplicate API calls"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        today = datetime.now().strftime("%Y-%m-%d")
-        cursor.execute(
-            """
-            SELECT price FROM price_history 
-            WHERE stock = ? AND date = ? AND source LIKE 'eodhd%'
-            ORDER BY id DESC 
-            LIMIT 1
-        """,
-            (stock_symbol, today),
-        )
+    def positions_array(
+        self, positions: Optional[Dict[str, Position]] = None
+    ) -> np.ndarray:
+        """Positions (current ones by default) as a structured NumPy array"""
+        if positions is None:
+            positions = self.get_positions()
+        return positions_to_array(positions)
+
+    @_serialized
+    def get_stored_price_today(
+        self, stock_symbol: str, today: Optional[str] = None
+    ) -> Optional[float]:
+        """Get a still-fresh API price stored today, to avoid duplicate API calls
 
-        result = cursor.fetchone()
-        conn.close()
+        During trading hours a price is reused for PRICE_CACHE_TTL seconds; after
+        the close, one fetched after the close is reused for the rest of the day.
+        """
+        # The date and the trading-hours cutoff come from the same ASX clock
+        now = datetime.now(ASX_TZ)
+        cutoff = _stored_price_cutoff(now)
+        result = self._conn.execute(
+            SQL_STORED_PRICE_TODAY,
+            (stock_symbol, today or now.date().isoformat(), cutoff),
+        ).fetchone()
 
         return result[0] if result else None
 
-    def calculate_cash_balance(self) -> float:
-        """Calculate cash balance from all transactions starting with initial cash"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @_serialized
+    def _cash_and_fees(self) -> Tuple[float, float]:
+        """Get (cash balance, total fees) from executed transactions in one query"""
+        cursor = self._conn.cursor()
 
+        # Starting cash comes from user settings when present (fallback to the
+        # instance variable for backward compatibility)
         cursor.execute(
             """
-            SELECT action, total, fees
-            FROM transactions 
+            SELECT
+                (SELECT starting_cash FROM user_settings ORDER BY id DESC LIMIT 1),
+                COALESCE(SUM(CASE action
+                    WHEN 'buy' THEN -(total + fees)
+                    WHEN 'sell' THEN total - fees
+                    ELSE 0 END), 0),
+                COALESCE(SUM(fees), 0)
+            FROM transactions
             WHERE status = 'executed'
-            ORDER BY date ASC
         """
         )
+        starting_cash, net_cash_flow, total_fees = cursor.fetchone()
+        if starting_cash is None:
+            starting_cash = self.starting_cash
 
-        transactions = cursor.fetchall()
-
-        # Get starting cash from user settings (fallback to instance variable for backward compatibility)
-        cursor.execute(
-            "SELECT starting_cash FROM user_settings ORDER BY id DESC LIMIT 1"
-        )
-        user_cash_result = cursor.fetchone()
-        starting_cash = user_cash_result[0] if user_cash_result else self.starting_cash
-
-        conn.close()
+        # Buys subtract total + fees, sells add total - fees
+        return starting_cash + net_cash_flow, total_fees
 
-        # Start with initial cash balance
-        cash_balance = starting_cash
-
-        for action, total, fees in transactions:
-            if action == "buy":
-                # Subtract money spent (total + fees)
-                cash_balance -= total + fees
-            elif action == "sell":
-                # Add money received (total - fees)
-                cash_balance += total - fees
-
-        return cash_balance
+    def calculate_cash_balance(self) -> float:
+        """Calculate cash balance from all transactions starting with initial cash"""
+        return self._cash_and_fees()[0]
 
     def get_portfolio_summary(
         self, api_key: str = "demo", use_api: bool = False, force: bool = False
     ) -> Dict:
         """Get complete portfolio summary with franking analysis"""
         positions = self.update_current_prices(api_key, use_api, force)
+        totals = portfolio_totals(positions_to_array(positions))
+        total_cost = totals.total_cost
+        total_market_value = totals.total_market_value
+        total_unrealized_pnl = totals.total_unrealized_pnl
 
-        total_cost = sum(pos.avg_cost * pos.quantity for pos in positions.values())
-        total_market_value = sum(pos.market_value for pos in positions.values())
-        total_unrealized_pnl = total_market_value - total_cost
-
-        # Calculate total fees paid
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT SUM(fees) FROM transactions WHERE status = "executed"')
-        total_fees = cursor.fetchone()[0] or 0.0
-        conn.close()
-
-        # Calculate cash balance
-        cash_balance = self.calculate_cash_balance()
+        # Cash balance and total fees paid
+        cash_balance, total_fees = self._cash_and_fees()
 
         # Calculate total portfolio value (stocks + cash)
         total_portfolio_value = total_market_value + cash_balance
@@ -532,10 +941,11 @@ class ASXPortfolioTracker:
             "last_updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         }
 
-        # Add franking analysis if available
-        if FRANKING_AVAILABLE and self.franking_calculator:
+        # Add franking analysis if available (nothing to analyse without holdings,
+        # e.g. for a new user)
+        if positions and self.franking_calculator:
             try:
-                franking_analysis = self.get_franking_summary()
+                franking_analysis = self.get_franking_summary(positions=positions)
                 summary.update(
                     {
                         "franking_credits": franking_analysis.get(
@@ -556,10 +966,13 @@ class ASXPortfolioTracker:
         return summary
 
     def get_franking_summary(
-        self, taxable_income: float = 85000, estimated_yield: float = 0.04
+        self,
+        taxable_income: float = 85000,
+        estimated_yield: float = 0.04,
+        positions: Optional[Dict[str, Position]] = None,
     ) -> Dict:
         """Get franking credit analysis for current portfolio"""
-        if not FRANKING_AVAILABLE or not self.franking_calculator:
+        if not self.franking_calculator:
             return {
                 "error": "Franking calculator not available",
                 "total_franking_credits": 0,
@@ -567,8 +980,9 @@ class ASXPortfolioTracker:
                 "franking_efficiency": 0,
             }
 
-        # Get positions with updated prices
-        positions = self.update_current_prices(use_api=False)
+        # Get positions with updated prices unless the caller already has them
+        if positions is None:
+            positions = self.update_current_prices(use_api=False)
         return self.franking_calculator.calculate_franking_benefit(
             positions, taxable_income, estimated_yield
         )
@@ -577,7 +991,7 @@ class ASXPortfolioTracker:
         self, taxable_income: float = 85000
     ) -> List[Dict]:
         """Get suggestions for optimizing franking credits"""
-        if not FRANKING_AVAILABLE or not self.franking_calculator:
+        if not self.franking_calculator:
             return []
 
         positions = self.get_positions()
@@ -587,18 +1001,84 @@ class ASXPortfolioTracker:
 
     def get_stock_franking_info(self, stock: str) -> Dict:
         """Get franking information for a specific stock"""
-        if not FRANKING_AVAILABLE or not self.franking_db:
+        if not self.franking_db:
             return {
                 "franking_rate": 0,
                 "sector": "Unknown",
                 "reliability": "unavailable",
             }
 
-        return self.franking_db.get_franking_info(stock)
+        # Franking data is static for the session, so look each stock up once
+        info = self._franking_info.get(stock)
+        if info is None:
+            info = self.franking_db.get_franking_info(stock)
+            self._franking_info[stock] = info
+        return info
+
+    @_serialized
+    def get_fresh_franking_stocks(
+        self, stocks: List[str], max_age_days: int = FRANKING_CACHE_DAYS
+    ) -> List[str]:
+        """Get stocks whose API franking data was stored within max_age_days"""
+        if not stocks:
+            return []
+
+        conn = self._conn
+        cursor = conn.cursor()
+
+        cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+        placeholders = ",".join("?" * len(stocks))
+        cursor.execute(
+            f"""
+            SELECT stock FROM franking_static_data
+            WHERE reliability = 'api_updated' AND last_updated >= ?
+            AND stock IN ({placeholders})
+        """,
+            (cutoff, *stocks),
+        )
+
+        fresh = [row[0] for row in cursor.fetchall()]
+
+        return fresh
+
+    @_serialized
+    def store_franking_updates(self, results: Dict[str, Dict]):
+        """Persist API franking results so later runs can skip fresh stocks"""
+        now = datetime.now().isoformat()
+        rows = [
+            (
+                stock,
+                info["franking_rate"],
+                info.get("sector") or self.get_stock_franking_info(stock)["sector"],
+                "api_updated",
+                now,
+            )
+            for stock, info in results.items()
+        ]
+
+        conn = self._conn
+        with conn:
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO franking_static_data
+                (stock, typical_franking_rate, sector, reliability, last_updated)
+                VALUES (?, ?, ?, ?, ?)
+            """,
+                rows,
+            )
+
+        # Later lookups this session should see the new rates too
+        calculator_db = getattr(self._franking_calculator, "franking_db", None)
+        for db in (self._franking_db, calculator_db):
+            if db is not None:
+                self._apply_stored_franking(db)
+        for stock in results:
+            self._franking_info.pop(stock, None)
 
+    @_serialized
     def save_tax_settings(self, settings: Dict):
         """Save tax settings to database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         cursor.execute(
@@ -617,11 +1097,11 @@ class ASXPortfolioTracker:
         )
 
         conn.commit()
-        conn.close()
 
+    @_serialized
     def get_tax_settings(self) -> Dict:
         """Get latest tax settings from database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         cursor.execute(
@@ -634,7 +1114,6 @@ class ASXPortfolioTracker:
         )
 
         result = cursor.fetchone()
-        conn.close()
 
         if result:
             return {
@@ -664,6 +1143,7 @@ class ASXPortfolioTracker:
             )
 
         summary = self.get_portfolio_summary()
+        include_franking = include_franking and self.franking_db is not None
 
         with open(filename, "w", newline="") as csvfile:
             writer = csv.writer(csvfile)
@@ -679,82 +1159,103 @@ class ASXPortfolioTracker:
                 "P&L %",
             ]
 
-            if include_franking and FRANKING_AVAILABLE:
+            if include_franking:
                 headers.extend(["Franking Rate", "Sector", "Effective Yield"])
 
             writer.writerow(headers)
 
-            for pos in summary["positions"].values():
-                pnl_pct = (
-                    ((pos.current_price / pos.avg_cost - 1) * 100)
-                    if pos.avg_cost > 0
-                    else 0
+            arr = positions_to_array(summary["positions"])
+            avg_cost = arr["avg_cost"]
+            market_value = arr["market_value"]
+
+            pnl_pct = (
+                np.divide(
+                    arr["current_price"],
+                    avg_cost,
+                    out=np.ones_like(avg_cost),
+                    where=avg_cost > 0,
                 )
-                row = [
-                    pos.stock,
-                    pos.quantity,
-                    f"${pos.avg_cost:.4f}",
-                    f"${pos.current_price:.4f}",
-                    f"${pos.market_value:.2f}",
-                    f"${pos.unrealized_pnl:.2f}",
-                    f"{pnl_pct:.2f}%",
-                ]
+                - 1
+            ) * 100
+
+            columns = [
+                arr["stock"].tolist(),
+                arr["quantity"].tolist(),
+                np.char.mod("$%.4f", avg_cost),
+                np.char.mod("$%.4f", arr["current_price"]),
+                np.char.mod("$%.2f", market_value),
+                np.char.mod("$%.2f", arr["unrealized_pnl"]),
+                np.char.mod("%.2f%%", pnl_pct),
+            ]
 
-                if include_franking and FRANKING_AVAILABLE:
-                    franking_info = self.get_stock_franking_info(pos.stock)
-                    effective_yield = (
-                        pos.market_value
-                        * 0.04
-                        * (1 + franking_info["franking_rate"] / 100 * 0.3)
-                        / pos.market_value
-                        * 100
-                        if pos.market_value > 0
-                        else 0
-                    )
-                    row.extend(
-                        [
-                            f"{franking_info['franking_rate']:.0f}%",
-                            franking_info["sector"],
-                            f"{effective_yield:.2f}%",
-                        ]
+            if include_franking:
+                franking_infos = [
+                    self.get_stock_franking_info(stock) for stock in columns[0]
+                ]
+                franking_rate = np.array(
+                    [info["franking_rate"] for info in franking_infos], dtype=float
+                )
+                effective_yield = (
+                    np.divide(
+                        market_value * 0.04 * (1 + franking_rate / 100 * 0.3),
+                        market_value,
+                        out=np.zeros_like(market_value),
+                        where=market_value > 0,
                     )
+                    * 100
+                )
+                columns.extend(
+                    [
+                        np.char.mod("%.0f%%", franking_rate),
+                        [info["sector"] for info in franking_infos],
+                        np.char.mod("%.2f%%", effective_yield),
+                    ]
+                )
 
-                writer.writerow(row)
+            writer.writerows(zip(*columns))
 
         print(f"Portfolio exported to {filename}")
         return filename
 
-    def is_new_user(self) -> bool:
-        """Check if this is a new user (no setup completed)"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    @_serialized
+    def db_state(self) -> Tuple[int, int]:
+        """Token that changes whenever the database does, for keying caches"""
+        # data_version moves when another connection commits and total_changes
+        # when this one writes, so together they tell us a cache is stale
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return version, self._conn.total_changes
+
+    @_serialized
+    def _user_flags(self) -> Tuple[bool, bool]:
+        """Get (setup completed, has transactions), re-read only after db changes"""
+        state = self.db_state()
+
+        if self._user_flags_cache is None or self._user_flags_cache[0] != state:
+            setup_completed, has_data = self._conn.execute(
+                """
+                SELECT
+                    EXISTS(SELECT 1 FROM user_settings WHERE setup_completed = 1),
+                    EXISTS(SELECT 1 FROM transactions)
+            """
+            ).fetchone()
+            self._user_flags_cache = (state, (bool(setup_completed), bool(has_data)))
 
-        # Check if user_settings table has any records with setup_completed=1
-        cursor.execute(
-            "SELECT setup_completed FROM user_settings WHERE setup_completed = 1 LIMIT 1"
-        )
-        result = cursor.fetchone()
-        conn.close()
+        return self._user_flags_cache[1]
 
-        return result is None
+    def is_new_user(self) -> bool:
+        """Check if this is a new user (no setup completed)"""
+        return not self._user_flags()[0]
 
     def has_any_data(self) -> bool:
         """Check if there's any existing portfolio data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Check for any transactions
-        cursor.execute("SELECT COUNT(*) FROM transactions")
-        transaction_count = cursor.fetchone()[0]
-
-        conn.close()
-        return transaction_count > 0
+        return self._user_flags()[1]
 
+    @_serialized
     def initialize_user_settings(
         self, starting_cash: float = 25000.0, portfolio_name: str = "My Portfolio"
     ):
         """Initialize user settings for a new user"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         # Insert initial user settings
@@ -770,18 +1271,17 @@ class ASXPortfolioTracker:
         self.starting_cash = starting_cash
 
         conn.commit()
-        conn.close()
 
+    @_serialized
     def get_user_settings(self) -> Dict:
         """Get current user settings"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn
         cursor = conn.cursor()
 
         cursor.execute(
             "SELECT setup_completed, starting_cash, portfolio_name, created_date FROM user_settings ORDER BY id DESC LIMIT 1"
         )
         result = cursor.fetchone()
-        conn.close()
 
         if result:
             return {
@@ -800,6 +1300,12 @@ class ASXPortfolioTracker:
             }
 
 
+# Row layout for the example positions table
+POSITION_LINE_FMT = (
+    "%s: %s shares @ $%.4f | Current: $%.4f | P&L: $%.2f (%.2f%%) | Franking: %.0f%%"
+)
+
+
 def main():
     """Example usage with franking analysis"""
     tracker = ASXPortfolioTracker()
@@ -839,7 +1345,7 @@ def main():
     print(f"Last Updated: {summary['last_updated']}")
 
     # Franking analysis
-    if FRANKING_AVAILABLE:
+    if tracker.franking_calculator:
         print(f"\n=== Franking Credit Analysis ===")
         print(f"Annual Franking Credits: ${summary.get('franking_credits', 0):.2f}")
         print(f"Tax Benefit: ${summary.get('tax_benefit', 0):.2f}")
@@ -847,7 +1353,7 @@ def main():
         print(f"Effective Tax Rate: {summary.get('effective_tax_rate', 0):.1f}%")
 
         # Get detailed franking analysis
-        franking_details = tracker.get_franking_summary()
+        franking_details = tracker.get_franking_summary(positions=summary["positions"])
         if "stock_details" in franking_details:
             print(f"\n=== Stock-by-Stock Franking Analysis ===")
             for stock in franking_details["stock_details"]:
@@ -858,16 +1364,29 @@ def main():
                 )
 
     print("\n=== Individual Positions ===")
-    for pos in summary["positions"].values():
-        pnl_pct = (
-            ((pos.current_price / pos.avg_cost - 1) * 100) if pos.avg_cost > 0 else 0
-        )
-        franking_info = tracker.get_stock_franking_info(pos.stock)
-        print(
-            f"{pos.stock}: {pos.quantity} shares @ ${pos.avg_cost:.4f} "
-            f"| Current: ${pos.current_price:.4f} | P&L: ${pos.unrealized_pnl:.2f} ({pnl_pct:.2f}%) "
-            f"| Franking: {franking_info['franking_rate']:.0f}%"
+    arr = tracker.positions_array(summary["positions"])
+    avg_cost = arr["avg_cost"]
+    pnl_pct = _pnl_percent(arr["current_price"], avg_cost)
+
+    stocks = arr["stock"].tolist()
+    franking_rates = [
+        tracker.get_stock_franking_info(stock)["franking_rate"] for stock in stocks
+    ]
+    lines = [
+        POSITION_LINE_FMT % row
+        for row in zip(
+            stocks,
+            arr["quantity"].tolist(),
+            avg_cost.tolist(),
+            arr["current_price"].tolist(),
+            arr["unrealized_pnl"].tolist(),
+            pnl_pct.tolist(),
+            franking_rates,
         )
+    ]
+    # One write for the whole table rather than a print() per position
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 if __name__ == "__main__":
@@ -3,23 +3,44 @@ Sample ASX prices for demo purposes when API is unavailable
 These are approximate prices and should be replaced with real API data
 """
 
-SAMPLE_ASX_PRICES = {
-    "WAX": 1.18,  # Warnex Mining
-    "WAM": 1.65,  # WAM Capital
-    "HLI": 5.02,  # Helloworld Travel
-    "YMAX": 7.75,  # Ymax Group
-    "WOW": 32.10,  # Woolworths
-    "CBA": 185.20,  # Commonwealth Bank
-    "CSL": 245.80,  # CSL Limited
-    "LNW": 155.40,  # LendLease
-    "DTR": 0.092,  # DTek Resources
-    "SDR": 4.52,  # SiteOne Landscape Supply
-    "BHP": 39.10,  # BHP Group
-    "NXT": 14.25,  # NextDC
-    "XRO": 180.50,  # Xero
-}
+from types import MappingProxyType
+
+import numpy as np
+
+# Read-only so nothing can change a price underneath a cached lookup
+SAMPLE_ASX_PRICES = MappingProxyType(
+    {
+        "WAX": 1.18,  # Warnex Mining
+        "WAM": 1.65,  # WAM Capital
+        "HLI": 5.02,  # Helloworld Travel
+        "YMAX": 7.75,  # Ymax Group
+        "WOW": 32.10,  # Woolworths
+        "CBA": 185.20,  # Commonwealth Bank
+        "CSL": 245.80,  # CSL Limited
+        "LNW": 155.40,  # LendLease
+        "DTR": 0.092,  # DTek Resources
+        "SDR": 4.52,  # SiteOne Landscape Supply
+        "BHP": 39.10,  # BHP Group
+        "NXT": 14.25,  # NextDC
+        "XRO": 180.50,  # Xero
+    }
+)
+
+
+# Price array with a ticker -> row index, for batch lookups
+_PRICES = np.array(list(SAMPLE_ASX_PRICES.values()), dtype=np.float64)
+_INDEX = {ticker: i for i, ticker in enumerate(SAMPLE_ASX_PRICES)}
 
 
 def get_sample_price(stock: str) -> float:
     """Get sample price for demo purposes"""
     return SAMPLE_ASX_PRICES.get(stock, 0.0)
+
+
+def get_sample_prices(stocks) -> np.ndarray:
+    """Get sample prices for many stocks at once (0.0 for unknown tickers)"""
+    stocks = list(stocks)
+    idx = np.fromiter(
+        (_INDEX.get(stock, -1) for stock in stocks), dtype=np.int64, count=len(stocks)
+    )
+    return np.where(idx >= 0, _PRICES[np.maximum(idx, 0)], 0.0)
@@ -5,7 +5,6 @@ Modern web interface for portfolio analysis and tracking
 """
 
 import os
-import sqlite3
 import sys
 from datetime import date, datetime
 
@@ -18,7 +17,6 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from config import EODHD_API_KEY
 from dividend_tracker import DividendTracker
-from portfolio_tracker import ASXPortfolioTracker
 # Import utilities and existing functionality
 from streamlit_utils import *
 
@@ -83,7 +81,7 @@ st.sidebar.title("Navigation")
 
 # Check if user needs setup for sidebar highlighting
 try:
-    temp_tracker = ASXPortfolioTracker()
+    temp_tracker = get_tracker()
     is_new_user = temp_tracker.is_new_user() and not temp_tracker.has_any_data()
 except:
     is_new_user = False
@@ -116,7 +114,7 @@ st.markdown(
 # Dashboard Page
 if page == "🏠 Dashboard":
     # Check if user needs setup (new user detection)
-    tracker = ASXPortfolioTracker()
+    tracker = get_tracker()
     if tracker.is_new_user() and not tracker.has_any_data():
         # Redirect new users to setup
         st.info(
@@ -211,11 +209,8 @@ if page == "🏠 Dashboard":
         if franking_available:
             st.subheader("💰 Franking Credits Overview")
 
-            # Initialize tracker for franking analysis
-            tracker = ASXPortfolioTracker()
-
             # Get franking summary with updated positions
-            franking_summary = tracker.get_franking_summary()
+            franking_summary = get_franking_summary()
 
             if franking_summary and "stock_details" in franking_summary:
                 fcol1, fcol2, fcol3 = st.columns(3)
@@ -242,15 +237,23 @@ if page == "🏠 Dashboard":
 
         with col1:
             # Portfolio allocation chart
-            allocation_fig = create_portfolio_overview_chart(summary)
+            allocation_fig = session_figure(
+                "allocation_fig", summary, create_portfolio_overview_chart
+            )
             if allocation_fig:
-                st.plotly_chart(allocation_fig, use_container_width=True)
+                st.plotly_chart(
+                    allocation_fig, use_container_width=True, key="allocation_chart"
+                )
 
         with col2:
             # Performance bar chart
-            performance_fig = create_performance_bar_chart(summary)
+            performance_fig = session_figure(
+                "performance_fig", summary, create_performance_bar_chart
+            )
             if performance_fig:
-                st.plotly_chart(performance_fig, use_container_width=True)
+                st.plotly_chart(
+                    performance_fig, use_container_width=True, key="performance_chart"
+                )
 
         # Positions table
         st.subheader("Current Positions")
@@ -280,7 +283,7 @@ elif page == "🚀 Setup":
     st.header("Welcome to ASX Portfolio Tracker! 🎉")
 
     # Check if user is already set up
-    tracker = ASXPortfolioTracker()
+    tracker = get_tracker()
     user_settings = tracker.get_user_settings()
 
     if user_settings["setup_completed"]:
@@ -672,11 +675,10 @@ elif page == "📊 Performance Analysis":
 
                 elif export_option == "Transaction History CSV":
                     # Export transaction history
-                    conn = sqlite3.connect("portfolio.db")
-                    transactions_df = pd.read_sql_query(
-                        "SELECT * FROM transactions ORDER BY date DESC", conn
-                    )
-                    conn.close()
+                    with get_conn() as conn:
+                        transactions_df = pd.read_sql_query(
+                            "SELECT * FROM transactions ORDER BY date DESC", conn
+                        )
 
                     if not transactions_df.empty:
                         csv = transactions_df.to_csv(index=False)
@@ -698,16 +700,17 @@ elif page == "📊 Performance Analysis":
                     # Export all database tables as separate CSV files in a ZIP
                     import io
                     import zipfile
-                    from tempfile import NamedTemporaryFile
-
-                    with NamedTemporaryFile(delete=False, suffix=".zip") as tmp_file:
-                        with zipfile.ZipFile(
-                            tmp_file.name, "w", zipfile.ZIP_DEFLATED
-                        ) as zip_file:
-                            # Connect to database
-                            conn = sqlite3.connect("portfolio.db")
-
-                            # Export each table as CSV
+                    from csv import writer as csv_writer
+
+                    # Build the archive in memory; it is handed to the
+                    # download button as bytes anyway
+                    zip_buffer = io.BytesIO()
+                    with zipfile.ZipFile(
+                        zip_buffer, "w", zipfile.ZIP_DEFLATED
+                    ) as zip_file:
+                        # Export each table as CSV, holding the shared
+                        # connection so no other session writes mid-export
+                        with get_conn() as conn:
                             tables = [
                                 "transactions",
                                 "price_history",
@@ -721,46 +724,44 @@ elif page == "📊 Performance Analysis":
 
                             for table in tables:
                                 try:
-                                    df = pd.read_sql_query(
-                                        f"SELECT * FROM {table}", conn
-                                    )
-                                    if not df.empty:
-                                        csv_buffer = io.StringIO()
-                                        df.to_csv(csv_buffer, index=False)
-                                        zip_file.writestr(
-                                            f"{table}.csv", csv_buffer.getvalue()
-                                        )
+                                    cursor = conn.execute(f"SELECT * FROM {table}")
+                                    first_row = cursor.fetchone()
                                 except Exception as e:
                                     # Table might not exist, skip it
                                     continue
+                                if first_row is None:
+                                    continue
 
-                            # Export current portfolio summary
-                            summary = get_portfolio_summary()
-                            positions_df = create_positions_table(summary)
-                            if not positions_df.empty:
-                                csv_buffer = io.StringIO()
-                                positions_df.to_csv(csv_buffer, index=False)
-                                zip_file.writestr(
-                                    "current_portfolio.csv", csv_buffer.getvalue()
-                                )
-
-                            conn.close()
-
-                        # Read the zip file for download
-                        with open(tmp_file.name, "rb") as f:
-                            zip_data = f.read()
-
-                        st.download_button(
-                            label="Download All Data (ZIP)",
-                            data=zip_data,
-                            file_name=f"portfolio_all_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                            mime="application/zip",
-                        )
-
-                        # Clean up
-                        import os
+                                # Stream rows from the cursor straight into the
+                                # archive member instead of via a DataFrame
+                                with zip_file.open(
+                                    f"{table}.csv", "w", force_zip64=True
+                                ) as raw, io.TextIOWrapper(
+                                    raw, encoding="utf-8", newline=""
+                                ) as text:
+                                    writer = csv_writer(text, lineterminator="\n")
+                                    writer.writerow(
+                                        [column[0] for column in cursor.description]
+                                    )
+                                    writer.writerow(first_row)
+                                    writer.writerows(cursor)
+
+                        # Export current portfolio summary
+                        summary = get_portfolio_summary()
+                        positions_df = create_positions_table(summary)
+                        if not positions_df.empty:
+                            csv_buffer = io.StringIO()
+                            positions_df.to_csv(csv_buffer, index=False)
+                            zip_file.writestr(
+                                "current_portfolio.csv", csv_buffer.getvalue()
+                            )
 
-                        os.unlink(tmp_file.name)
+                    st.download_button(
+                        label="Download All Data (ZIP)",
+                        data=zip_buffer.getvalue(),
+                        file_name=f"portfolio_all_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                        mime="application/zip",
+                    )
 
             except Exception as e:
                 st.error(f"Export error: {str(e)}")
@@ -782,7 +783,7 @@ elif page == "🏛️ Franking Credits":
     st.header("Franking Credits Analysis")
 
     # Initialize tracker
-    tracker = ASXPortfolioTracker()
+    tracker = get_tracker()
 
     # Check if franking is available
     try:
@@ -798,7 +799,7 @@ elif page == "🏛️ Franking Credits":
 
     if franking_available:
         # Get portfolio summary with franking
-        summary = tracker.get_portfolio_summary()
+        summary = get_portfolio_summary()
 
         if not summary["positions"]:
             st.warning(
@@ -828,7 +829,7 @@ elif page == "🏛️ Franking Credits":
             st.subheader("Stock-by-Stock Franking Analysis")
 
             # Get detailed franking data
-            franking_details = tracker.get_franking_summary()
+            franking_details = get_franking_summary()
 
             if franking_details and "stock_details" in franking_details:
                 # Create dataframe for display
@@ -872,28 +873,7 @@ elif page == "🏛️ Franking Credits":
 
             # Franking optimization suggestions
             st.subheader("Optimization Suggestions")
-
-            # Tax income input for optimization
-            col1, col2 = st.columns(2)
-            with col1:
-                taxable_income = st.number_input(
-                    "Taxable Income", min_value=0, value=85000, step=1000
-                )
-
-            with col2:
-                if st.button("Get Optimization Suggestions"):
-                    suggestions = tracker.get_franking_optimization_suggestions(
-                        taxable_income
-                    )
-
-                    if suggestions:
-                        for suggestion in suggestions:
-                            message = suggestion.get("message", str(suggestion))
-                            st.info(f"💡 {message}")
-                    else:
-                        st.success(
-                            "Your portfolio is already well-optimized for franking credits!"
-                        )
+            render_franking_suggestions(tracker)
 
 # CGT Analysis Page
 elif page == "💰 CGT Analysis":
@@ -904,7 +884,7 @@ elif page == "💰 CGT Analysis":
         from cgt_calculator import CGTCalculator
 
         # Initialize CGT calculator
-        tracker = ASXPortfolioTracker()
+        tracker = get_tracker()
         cgt_calc = CGTCalculator(tracker.db_path)
 
         # Initialize CGT tracking if needed
@@ -1132,7 +1112,7 @@ elif page == "🧮 Tax Calculator":
     st.header("Tax Calculator")
 
     # Initialize tracker
-    tracker = ASXPortfolioTracker()
+    tracker = get_tracker()
 
     # Check if franking is available
     try:
@@ -1194,7 +1174,7 @@ elif page == "🧮 Tax Calculator":
             st.subheader("Tax Calculation Results")
 
             # Get franking analysis with current settings
-            franking_analysis = tracker.get_franking_summary(taxable_income)
+            franking_analysis = get_franking_summary(taxable_income)
 
             if franking_analysis:
                 col1, col2, col3 = st.columns(3)
@@ -1307,13 +1287,11 @@ elif page == "⚙️ Settings":
     ):
         if st.checkbox("I understand this will delete all data"):
             try:
-                conn = sqlite3.connect("portfolio.db")
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM transactions")
-                cursor.execute("DELETE FROM price_history")
-                cursor.execute("DELETE FROM dividends")
-                conn.commit()
-                conn.close()
+                # Hold the shared connection and delete in one transaction
+                with get_conn() as conn, conn:
+                    conn.execute("DELETE FROM transactions")
+                    conn.execute("DELETE FROM price_history")
+                    conn.execute("DELETE FROM dividends")
 
                 st.success("All data cleared successfully")
                 st.rerun()
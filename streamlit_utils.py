@@ -6,7 +6,6 @@ Helper functions for the Streamlit web interface
 
 import base64
 import io
-import sqlite3
 from datetime import date, datetime
 
 import pandas as pd
@@ -20,10 +19,21 @@ from dividend_tracker import DividendTracker
 from portfolio_tracker import ASXPortfolioTracker
 
 
+@st.cache_resource
+def get_tracker():
+    """Shared tracker, so reruns and pages reuse one SQLite connection"""
+    return ASXPortfolioTracker()
+
+
+def get_conn():
+    """The shared tracker's SQLite connection, locked to the caller in a with block"""
+    return get_tracker().locked_connection()
+
+
 def init_session_state():
     """Initialize Streamlit session state variables"""
     if "tracker" not in st.session_state:
-        st.session_state.tracker = ASXPortfolioTracker()
+        st.session_state.tracker = get_tracker()
     if "dividend_tracker" not in st.session_state:
         st.session_state.dividend_tracker = DividendTracker()
     if "last_update" not in st.session_state:
@@ -32,9 +42,29 @@ def init_session_state():
         st.session_state.portfolio_data = None
 
 
+@st.cache_data(ttl=60)
+def _cached_portfolio_summary(db_state):
+    """Summary from stored prices, recomputed only when the database changes"""
+    return get_tracker().get_portfolio_summary(EODHD_API_KEY)
+
+
 def get_portfolio_summary(use_api=False, force=False):
     """Get portfolio summary with caching"""
-    return st.session_state.tracker.get_portfolio_summary(EODHD_API_KEY, use_api, force)
+    if use_api or force:
+        return get_tracker().get_portfolio_summary(EODHD_API_KEY, use_api, force)
+    return _cached_portfolio_summary(get_tracker().db_state())
+
+
+@st.cache_data(ttl=60)
+def _cached_franking_summary(db_state, taxable_income):
+    """Franking summary for the stored-price positions, keyed like the summary"""
+    positions = _cached_portfolio_summary(db_state)["positions"]
+    return get_tracker().get_franking_summary(taxable_income, positions=positions)
+
+
+def get_franking_summary(taxable_income=85000):
+    """Get franking summary with caching"""
+    return _cached_franking_summary(get_tracker().db_state(), taxable_income)
 
 
 def format_currency(value):
@@ -73,6 +103,19 @@ def create_metric_card(title, value, delta=None, delta_color=None):
             st.metric(title, value, delta=delta)
 
 
+def session_figure(name, summary, build):
+    """Build a summary chart once per session, again only when positions change"""
+    # Quantity, cost and price determine every value the charts plot
+    data_key = tuple(
+        (stock, pos.quantity, pos.avg_cost, pos.current_price)
+        for stock, pos in summary["positions"].items()
+    )
+    cached = st.session_state.get(name)
+    if cached is None or cached[0] != data_key:
+        cached = st.session_state[name] = (data_key, build(summary))
+    return cached[1]
+
+
 def create_portfolio_overview_chart(summary):
     """Create portfolio overview donut chart"""
     if not summary["positions"]:
@@ -248,42 +291,45 @@ def download_button(data, filename, label):
 
 def get_database_info():
     """Get database information"""
-    conn = sqlite3.connect("portfolio.db")
-    cursor = conn.cursor()
-
-    try:
-        # Get transaction count
-        cursor.execute("SELECT COUNT(*) FROM transactions")
-        transaction_count = cursor.fetchone()[0]
-
-        # Get price history count
-        cursor.execute("SELECT COUNT(*) FROM price_history")
-        price_count = cursor.fetchone()[0]
-
-        # Get date range
-        cursor.execute("SELECT MIN(date), MAX(date) FROM price_history")
-        date_range = cursor.fetchone()
-
-        # Get stocks count
-        cursor.execute("SELECT COUNT(DISTINCT stock) FROM transactions")
-        stock_count = cursor.fetchone()[0]
-
-        conn.close()
-
-        return {
-            "transactions": transaction_count,
-            "price_points": price_count,
-            "date_range": date_range,
-            "stocks": stock_count,
-        }
-    except Exception as e:
-        conn.close()
-        return {
-            "transactions": 0,
-            "price_points": 0,
-            "date_range": (None, None),
-            "stocks": 0,
-        }
+    return _cached_database_info(get_tracker().db_state())
+
+
+@st.cache_data(ttl=60)
+def _cached_database_info(db_state):
+    """Database counts, re-read only when the database changes"""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+
+        try:
+            # Get transaction count
+            cursor.execute("SELECT COUNT(*) FROM transactions")
+            transaction_count = cursor.fetchone()[0]
+
+            # Get price history count
+            cursor.execute("SELECT COUNT(*) FROM price_history")
+            price_count = cursor.fetchone()[0]
+
+            # Get date range
+            cursor.execute("SELECT MIN(date), MAX(date) FROM price_history")
+            date_range = cursor.fetchone()
+
+            # Get stocks count
+            cursor.execute("SELECT COUNT(DISTINCT stock) FROM transactions")
+            stock_count = cursor.fetchone()[0]
+
+            return {
+                "transactions": transaction_count,
+                "price_points": price_count,
+                "date_range": date_range,
+                "stocks": stock_count,
+            }
+        except Exception as e:
+            return {
+                "transactions": 0,
+                "price_points": 0,
+                "date_range": (None, None),
+                "stocks": 0,
+            }
 
 
 def validate_transaction_input(stock, action, quantity, price):
@@ -308,15 +354,11 @@ def validate_transaction_input(stock, action, quantity, price):
 def add_transaction(stock, action, quantity, price, transaction_date):
     """Add transaction using existing functionality"""
     try:
-        # Calculate total and fees
         total = quantity * price
-        fees = st.session_state.tracker.calculate_brokerage(total)
-
-        # Create CSV format for import
-        csv_data = f"Date,Stock,Action,Quantity,Price,Total,Status\n{transaction_date},{stock},{action},{quantity},{price},{total},executed"
 
-        # Import transaction
-        st.session_state.tracker.import_transactions_from_csv(csv_data)
+        st.session_state.tracker.add_transaction(
+            str(transaction_date), stock, action, quantity, price, total
+        )
 
         return (
             True,
@@ -460,3 +502,27 @@ def create_franking_by_sector_chart(franking_summary):
     fig.update_layout(title="Franking Credits by Sector", height=400)
 
     return fig
+
+
+@st.fragment
+def render_franking_suggestions(tracker):
+    """Income input and suggestions, rerun on their own without the page above"""
+    # Tax income input for optimization
+    col1, col2 = st.columns(2)
+    with col1:
+        taxable_income = st.number_input(
+            "Taxable Income", min_value=0, value=85000, step=1000
+        )
+
+    with col2:
+        if st.button("Get Optimization Suggestions"):
+            suggestions = tracker.get_franking_optimization_suggestions(taxable_income)
+
+            if suggestions:
+                for suggestion in suggestions:
+                    message = suggestion.get("message", str(suggestion))
+                    st.info(f"💡 {message}")
+            else:
+                st.success(
+                    "Your portfolio is already well-optimized for franking credits!"
+                )